@@ -0,0 +1,61 @@
+# Núcleo de procesamiento de señales sin interfaz gráfica
+# Daniel Nava Mondragón A0166161649
+#
+# Solo depende de numpy y scipy: lo usan las tres HMI y los procesos por lotes.
+#
+# Importar scipy.signal tarda más de un segundo, así que los nombres de este
+# paquete se cargan al primer uso: "import dsp" o "from dsp import perfil"
+# no importan scipy, "from dsp import lowpass_filter" sí.
+
+import importlib
+
+# Nombre público -> submódulo que lo define
+_EXPORTS = {
+    "lowpass_filter": "filtros",
+    "highpass_filter": "filtros",
+    "bandpass_filter": "filtros",
+    "design_filter": "filtros",
+    "filter_cache_info": "filtros",
+    "clear_filter_cache": "filtros",
+    "filter_bank": "filtros",
+    "compute_fft": "espectro",
+    "welch_psd": "espectro",
+    "spectrogram": "espectro",
+    "SlidingSpectrogram": "espectro",
+    "WavFile": "wav",
+    "WavWriter": "wav",
+    "load_wav": "wav",
+    "save_wav": "wav",
+    "pcm_to_float": "wav",
+    "float_to_pcm": "wav",
+    "iter_wav_blocks": "bloques",
+    "StreamFilter": "bloques",
+    "filter_array": "bloques",
+    "filter_range": "bloques",
+    "filter_wav_file": "bloques",
+    "sos_filter_wav_file": "bloques",
+    "design_fir": "fir",
+    "fir_filter": "fir",
+    "StreamFIR": "fir",
+    "resample": "remuestreo",
+    "decimate_for_band": "remuestreo",
+    "StreamResampler": "remuestreo",
+    "Pipeline": "cadena",
+    "SpectralIndex": "indice",
+    "build_index": "indice",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value  # Las siguientes búsquedas ya no pasan por aquí
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,260 @@
+# Filtrado por bloques de archivos WAV que no caben en memoria
+#
+# Los archivos se leen en bloques de tamaño fijo y la salida se escribe a
+# medida que se produce, de modo que la memoria usada no depende de la
+# duración de la grabación.
+
+import numpy as np
+from scipy import signal
+
+from .filtros import design_filter
+from .perfil import profiled
+from .wav import WavFile, WavWriter, float_to_pcm
+
+# Tamaño de bloque por defecto (muestras por canal)
+BLOCK_SIZE = 65536
+
+
+def iter_wav_blocks(path, block_size=BLOCK_SIZE):
+    """
+    Recorre un archivo WAV por bloques. Devuelve (bloque, frecuencia de
+    muestreo) donde cada bloque es una vista (muestras, canales) del archivo
+    proyectado en memoria.
+    """
+    wav_file = WavFile(path)
+    for first in range(0, wav_file.frames, block_size):
+        yield wav_file.read_frames(first, first + block_size), wav_file.sample_rate
+
+
+class StreamFilter:
+    """
+    Filtro causal (sosfilt) que conserva su estado entre bloques.
+
+    Procesar una señal bloque a bloque da el mismo resultado que filtrarla
+    completa con sosfilt. dtype es la precisión de los bloques de salida;
+    los coeficientes y el estado se guardan en float64 (ver
+    filtros._filtfilt).
+    """
+
+    def __init__(self, sos, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.sos = np.asarray(sos, dtype=np.float64)
+        self.zi = None
+
+    def reset(self):
+        self.zi = None
+
+    @profiled('filtro')
+    def process(self, block):
+        block = np.asarray(block, dtype=self.dtype)
+        if self.zi is None:
+            # Estado inicial en régimen permanente para el primer valor,
+            # así se evita el transitorio de arranque.
+            zi = signal.sosfilt_zi(self.sos)
+            first = block[0]
+            self.zi = zi.reshape(zi.shape + (1,) * (block.ndim - 1)) * first
+        out, self.zi = signal.sosfilt(self.sos, block, axis=0, zi=self.zi)
+        return out.astype(self.dtype, copy=False)
+
+
+def impulse_length(sos, tol=1e-6, max_length=1 << 20):
+    """
+    Número de muestras tras el cual la respuesta al impulso del filtro cae
+    por debajo de tol veces su máximo. Sirve para elegir el traslape del
+    modo de fase cero.
+
+    El término directo h[0] no cuenta para el máximo: en un pasa altas vale
+    casi 1 mientras la cola es mucho menor, y medirla contra él la cortaría
+    demasiado pronto.
+    """
+    impulse = np.zeros(min(max_length, 4096))
+    impulse[0] = 1.0
+    while True:
+        h = np.abs(signal.sosfilt(sos, impulse))[1:]
+        above = np.nonzero(h > tol * h.max())[0]
+        last = int(above[-1]) + 2 if len(above) else 1
+        if last < len(impulse) or len(impulse) >= max_length:
+            return last
+        impulse = np.zeros(min(2 * len(impulse), max_length))
+        impulse[0] = 1.0
+
+
+@profiled('filtro')
+def _sosfiltfilt_segment(sos, segment):
+    # sosfiltfilt exige que el segmento sea más largo que su relleno; el
+    # último bloque de un archivo puede ser muy corto.
+    ntaps = 2 * len(sos) + 1
+    ntaps -= min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    padlen = min(3 * ntaps, len(segment) - 1)
+    return signal.sosfiltfilt(sos, segment, axis=0, padlen=padlen)
+
+
+def zero_phase_blocks(blocks, sos, overlap, dtype=np.float64):
+    """
+    Aproximación de filtfilt por bloques: cada bloque se filtra hacia
+    adelante y hacia atrás junto con overlap muestras del bloque anterior y
+    del siguiente, y solo se conserva la parte central.
+
+    Con un traslape mayor que la respuesta al impulso del filtro el
+    resultado coincide con filtfilt salvo errores de redondeo.
+    """
+    history = None
+    pending = None
+    ahead = []  # Bloques ya leídos después de pending
+    ahead_frames = 0
+    for block in blocks:
+        block = np.asarray(block, dtype=dtype)
+        if pending is None:
+            pending = block
+            continue
+        ahead.append(block)
+        ahead_frames += len(block)
+        # Con bloques más cortos que el traslape el contexto hacia adelante
+        # se junta de varios bloques
+        while ahead and ahead_frames >= overlap:
+            yield _filter_with_context(sos, history, pending, _head(ahead, overlap), dtype)
+            history = _tail(history, pending, overlap)
+            pending = ahead.pop(0)
+            ahead_frames -= len(pending)
+    while pending is not None:
+        yield _filter_with_context(sos, history, pending,
+                                   _head(ahead, overlap) if ahead else None, dtype)
+        history = _tail(history, pending, overlap)
+        pending = ahead.pop(0) if ahead else None
+
+
+def filter_array(data, sos, block_size=BLOCK_SIZE, zero_phase=True, overlap=None,
+                 progress=None, dtype=np.float64, out=None):
+    """
+    Filtra un arreglo (muestras[, canales]) por bloques y devuelve la señal
+    filtrada completa.
+
+    dtype es la precisión de la señal; con np.float32 la salida ocupa la
+    mitad (los coeficientes siguen en float64). En modo de fase cero el bloque crece hasta el traslape si es
+    más corto. Si se da out (del mismo tamaño que data) la salida se escribe
+    ahí en lugar de reservar un arreglo nuevo.
+
+    progress(hechas, total) se llama después de cada bloque; sirve para
+    mostrar el avance y, lanzando una excepción, para cancelar el trabajo
+    sin esperar a que termine la señal entera.
+    """
+    data = np.asarray(data)
+    total = len(data)
+    if out is None:
+        out = np.empty(data.shape, dtype=dtype)
+    elif out.shape != data.shape:
+        raise ValueError(f"out tiene forma {out.shape}, se esperaba {data.shape}")
+    if zero_phase:
+        if overlap is None:
+            overlap = impulse_length(sos)
+        # Con bloques más cortos que el traslape cada uno se filtraría con
+        # mucho más contexto que señal
+        block_size = max(block_size, overlap)
+    blocks = (_from_pcm(data[i:i + block_size], dtype) for i in range(0, total, block_size))
+    if zero_phase:
+        filtered = zero_phase_blocks(blocks, sos, overlap, dtype)
+    else:
+        stream = StreamFilter(sos, dtype)
+        filtered = (stream.process(block) for block in blocks)
+
+    done = 0
+    for block in filtered:
+        out[done:done + len(block)] = block
+        done += len(block)
+        if progress is not None:
+            progress(done, total)
+    return out
+
+
+def filter_range(data, sos, first, last, pad=None, dtype=np.float64):
+    """
+    Filtra con fase cero solo las muestras [first, last) de data.
+
+    Se toman pad muestras extra a cada lado (por defecto la longitud
+    efectiva de la respuesta al impulso) para que el resultado coincida con
+    el de filtrar la señal completa, sin transitorios en los bordes.
+    """
+    if pad is None:
+        pad = impulse_length(sos)
+    first = max(0, int(first))
+    last = min(len(data), int(last))
+    start = max(0, first - pad)
+    segment = _from_pcm(np.asarray(data[start:min(len(data), last + pad)]), dtype)
+    out = _sosfiltfilt_segment(sos, segment)[first - start:last - start]
+    return out.astype(dtype, copy=False)
+
+
+def _head(blocks, overlap):
+    # Primeras overlap muestras de una lista de bloques consecutivos
+    return blocks[0][:overlap] if len(blocks) == 1 else np.concatenate(blocks)[:overlap]
+
+
+def _tail(history, block, overlap):
+    # Últimas overlap muestras ya vistas, para usarlas como contexto
+    if history is not None and len(block) < overlap:
+        block = np.concatenate([history, block])
+    return block[max(len(block) - overlap, 0):]
+
+
+def _filter_with_context(sos, history, block, ahead, dtype):
+    parts = [p for p in (history, block, ahead) if p is not None]
+    segment = np.concatenate(parts) if len(parts) > 1 else block
+    start = 0 if history is None else len(history)
+    return _sosfiltfilt_segment(sos, segment)[start:start + len(block)].astype(dtype, copy=False)
+
+
+def _to_pcm(block, dtype):
+    # Los bloques son temporales: se pueden redondear y saturar en el lugar
+    if dtype.kind == 'f':
+        return block.astype(dtype)
+    return float_to_pcm(block, dtype, overwrite=True)
+
+
+@profiled('convertir')
+def _from_pcm(block, dtype=np.float64):
+    # Muestras en la escala PCM original (sin normalizar), en flotante
+    out = block.astype(dtype)
+    if block.dtype == np.uint8:
+        out -= 128
+    return out
+
+
+def filter_wav_file(src, dst, btype, cutoff, order=5, block_size=BLOCK_SIZE,
+                    zero_phase=False, overlap=None, dtype=np.float64):
+    """
+    Filtra un archivo WAV por bloques y escribe el resultado en dst.
+
+    Por defecto el filtro es causal (sosfilt con estado entre bloques). Con
+    zero_phase=True se usa la aproximación de fase cero por traslape; si no
+    se indica overlap se toma la longitud efectiva de la respuesta al
+    impulso. La memoria usada depende solo de block_size y overlap.
+    """
+    sample_rate = WavFile(src).sample_rate
+    sos = design_filter(btype, sample_rate, cutoff, order)
+    sos_filter_wav_file(src, dst, sos, block_size, zero_phase, overlap, dtype)
+
+
+def sos_filter_wav_file(src, dst, sos, block_size=BLOCK_SIZE, zero_phase=False,
+                        overlap=None, dtype=np.float64):
+    """
+    Igual que filter_wav_file pero con secciones SOS ya diseñadas, por
+    ejemplo la cascada de varios filtros apilados con np.vstack.
+    """
+    wav_file = WavFile(src)
+    pcm_dtype = wav_file.dtype
+
+    if zero_phase:
+        if overlap is None:
+            overlap = impulse_length(sos)
+        block_size = max(block_size, overlap)  # Ver filter_array
+    blocks = (_from_pcm(block, dtype) for block, _ in iter_wav_blocks(src, block_size))
+    if zero_phase:
+        filtered = zero_phase_blocks(blocks, sos, overlap, dtype)
+    else:
+        stream = StreamFilter(sos, dtype)
+        filtered = (stream.process(block) for block in blocks)
+
+    with WavWriter(dst, wav_file.sample_rate, wav_file.channels, pcm_dtype,
+                   wav_file.sampwidth) as out_file:
+        for block in filtered:
+            out_file.write(_to_pcm(block, pcm_dtype))
@@ -0,0 +1,149 @@
+# Caché en disco de resultados procesados
+#
+# Cada resultado se guarda con una clave que combina el hash del contenido
+# del archivo de entrada con los parámetros del procesamiento, así que
+# repetir el mismo filtro sobre el mismo audio devuelve el WAV ya calculado
+# aunque el archivo se haya copiado o renombrado. El tamaño total está
+# acotado y se desalojan primero los resultados usados hace más tiempo.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# Directorio por defecto; se puede cambiar con la variable DSP_CACHE_DIR
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'procesamiento-senales')
+
+# Tamaño máximo por defecto (bytes)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Cambiar cuando cambie la forma de procesar, para invalidar lo anterior
+CACHE_VERSION = 2
+
+_HASH_CHUNK = 1 << 20
+
+
+class ResultCache:
+    """
+    Caché de archivos WAV procesados, direccionada por contenido y con
+    desalojo LRU cuando se supera max_bytes.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get('DSP_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._hashes = {}  # (ruta, tamaño, mtime) -> hash del contenido
+        self._lock = threading.Lock()
+
+    def file_hash(self, path):
+        """
+        SHA-256 del contenido del archivo. Se recuerda mientras el archivo
+        no cambie de tamaño ni de fecha, para no volver a leerlo.
+        """
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            with self._lock:
+                self._hashes[memo_key] = digest
+        return digest
+
+    def key(self, path, params):
+        """
+        Clave del resultado de procesar path con los parámetros params
+        (cualquier estructura serializable en JSON).
+        """
+        description = json.dumps({"entrada": self.file_hash(path), "parametros": params,
+                                  "version": CACHE_VERSION}, sort_keys=True)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.wav')
+
+    def get(self, key):
+        """
+        Ruta del resultado guardado o None. Un acierto lo marca como usado.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, render):
+        """
+        Calcula un resultado con render(ruta_temporal), lo guarda bajo key y
+        devuelve su ruta en la caché.
+        """
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        os.close(fd)
+        try:
+            render(tmp)
+            path = self._path(key)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def get_or_create(self, path, params, render):
+        """
+        Devuelve la ruta en caché del resultado de procesar path con params,
+        calculándolo con render(ruta_temporal) solo si no estaba guardado.
+        """
+        key = self.key(path, params)
+        return self.get(key) or self.put(key, render)
+
+    def entries(self):
+        """
+        Resultados guardados como lista de (ruta, tamaño, último uso), del
+        más antiguo al más reciente.
+        """
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.wav'):
+                stat = entry.stat()
+                found.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda e: e[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Borra los resultados menos usados hasta quedar por debajo de
+        max_bytes. El resultado keep nunca se borra.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # En uso (en Windows no se puede borrar un archivo abierto o
+                # proyectado en memoria): se conserva hasta la próxima vez
+                continue
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
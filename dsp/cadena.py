@@ -0,0 +1,360 @@
+# Cadenas de procesamiento componibles
+#
+# Una cadena es una lista de etapas (filtros Butterworth, muesca, ganancia,
+# remuestreo y tomas de espectro) que se aplica por bloques. Las etapas IIR
+# contiguas se funden en una sola cascada de secciones SOS, de modo que un
+# pasa altas seguido de una muesca es una sola pasada sobre cada bloque.
+#
+# Los filtros pueden usar el motor FIR de fase lineal (fir.py); esas etapas
+# no se funden con las IIR y en modo de fase cero son exactas.
+#
+# La cadena se guarda como JSON, así las HMI y los procesos por lotes
+# comparten las mismas definiciones.
+
+import json
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+
+from .bloques import BLOCK_SIZE, StreamFilter, impulse_length, zero_phase_blocks
+from .bloques import _from_pcm, _to_pcm
+from .filtros import design_filter
+from .fir import FIR_TAPS, StreamFIR, design_fir
+from .perfil import profiled, stage
+from .remuestreo import StreamResampler, resample_ratio
+from .wav import WavFile, WavWriter
+
+PIPELINE_VERSION = 1
+
+# Orden por defecto de cada tipo de filtro, igual que en analisis_seniales
+DEFAULT_ORDER = {'low': 5, 'high': 10, 'band': 5}
+
+# Factor de calidad por defecto de la muesca
+NOTCH_Q = 30.0
+
+# Etapas IIR: se pueden fundir en una sola cascada
+_IIR_TYPES = ('low', 'high', 'band', 'notch')
+
+
+def _check_stage(stage):
+    kind = stage.get('tipo')
+    required = {
+        'low': ('corte',), 'high': ('corte',), 'band': ('corte',),
+        'notch': ('frecuencia',), 'gain': ('db',), 'resample': ('frecuencia',),
+        'spectrum': ('nombre',),
+    }
+    if kind not in required:
+        raise ValueError(f"Tipo de etapa desconocido: {kind!r}")
+    missing = [key for key in required[kind] if key not in stage]
+    if missing:
+        raise ValueError(f"A la etapa {kind!r} le falta {', '.join(missing)}")
+    if kind == 'band' and len(stage['corte']) != 2:
+        raise ValueError("El pasa banda necesita dos cortes")
+    if stage.get('motor', 'iir') not in ('iir', 'fir'):
+        raise ValueError(f"Motor desconocido: {stage['motor']!r}")
+    if stage.get('motor') == 'fir' and kind not in DEFAULT_ORDER:
+        raise ValueError(f"La etapa {kind!r} no admite el motor FIR")
+
+
+def parse_stage(text):
+    """
+    Convierte una etapa escrita como texto en su diccionario:
+
+        low:1000[:orden]  high:300[:orden]  band:1000-5000[:orden]
+        low:1000:fir[:coeficientes]  (igual para high y band)
+        notch:60[:q]  gain:-6  resample:4000  spectrum:nombre[:nperseg]
+    """
+    parts = text.strip().split(':')
+    kind, args = parts[0], parts[1:]
+    fir = kind in DEFAULT_ORDER and len(args) >= 2 and args[1] == 'fir'
+    if fir:
+        del args[1]
+    if not args or len(args) > 2:
+        raise ValueError(f"Etapa no válida: {text!r}")
+    if kind in DEFAULT_ORDER:
+        if kind == 'band':
+            cutoff = [float(c) for c in args[0].split('-')]
+        else:
+            cutoff = float(args[0])
+        if fir:
+            stage = {'tipo': kind, 'corte': cutoff, 'motor': 'fir',
+                     'coeficientes': int(args[1]) if len(args) == 2 else FIR_TAPS}
+        else:
+            order = int(args[1]) if len(args) == 2 else DEFAULT_ORDER[kind]
+            stage = {'tipo': kind, 'corte': cutoff, 'orden': order}
+    elif kind == 'notch':
+        stage = {'tipo': kind, 'frecuencia': float(args[0]),
+                 'q': float(args[1]) if len(args) == 2 else NOTCH_Q}
+    elif kind == 'gain' and len(args) == 1:
+        stage = {'tipo': kind, 'db': float(args[0])}
+    elif kind == 'resample' and len(args) == 1:
+        stage = {'tipo': kind, 'frecuencia': float(args[0])}
+    elif kind == 'spectrum':
+        stage = {'tipo': kind, 'nombre': args[0]}
+        if len(args) == 2:
+            stage['nperseg'] = int(args[1])
+    else:
+        raise ValueError(f"Etapa no válida: {text!r}")
+    _check_stage(stage)
+    return stage
+
+
+def _stage_sos(stage, sample_rate):
+    kind = stage['tipo']
+    if kind == 'notch':
+        b, a = signal.iirnotch(stage['frecuencia'], stage.get('q', NOTCH_Q), fs=sample_rate)
+        return signal.tf2sos(b, a)
+    cutoff = tuple(stage['corte']) if kind == 'band' else stage['corte']
+    return design_filter(kind, sample_rate, cutoff, stage.get('orden', DEFAULT_ORDER[kind]))
+
+
+class SpectrumTap:
+    """
+    Toma de espectro: deja pasar la señal y acumula su densidad espectral
+    de potencia por el método de Welch (ventana de Hann, traslape del 50 %).
+    """
+
+    def __init__(self, name, sample_rate, nperseg=4096):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        self.hop = nperseg // 2
+        self.window = signal.get_window('hann', nperseg)
+        self._pending = None
+        self._sum = None
+        self.segments = 0
+
+    @profiled('espectro')
+    def add(self, block):
+        data = block if self._pending is None else np.concatenate([self._pending, block])
+        n = (len(data) - self.nperseg) // self.hop + 1 if len(data) >= self.nperseg else 0
+        if n:
+            idx = np.arange(self.nperseg)[None, :] + self.hop * np.arange(n)[:, None]
+            segments = data[idx]
+            segments = segments - segments.mean(axis=1, keepdims=True)
+            window = self.window.reshape((1, -1) + (1,) * (data.ndim - 1))
+            power = np.abs(sp_fft.rfft(segments * window, axis=1)) ** 2
+            total = power.sum(axis=0)
+            self._sum = total if self._sum is None else self._sum + total
+            self.segments += n
+        # Copia: el bloque puede modificarse en el lugar más adelante
+        self._pending = np.array(data[n * self.hop:])
+
+    def result(self):
+        """
+        Devuelve (frecuencias, densidad) promediadas sobre todos los
+        segmentos completos vistos, con la escala de scipy.signal.welch.
+        """
+        freq = sp_fft.rfftfreq(self.nperseg, 1 / self.sample_rate)
+        if not self.segments:
+            return freq, None
+        psd = self._sum / (self.segments * self.sample_rate * (self.window ** 2).sum())
+        psd[1:-1 if self.nperseg % 2 == 0 else None] *= 2
+        return freq, psd
+
+
+class Pipeline:
+    """
+    Cadena de etapas de procesamiento aplicada por bloques.
+
+    Cada etapa es un diccionario con la clave 'tipo' (low, high, band,
+    notch, gain, resample o spectrum) y sus parámetros; ver parse_stage.
+    Los filtros low, high y band usan el motor FIR si llevan 'motor': 'fir'.
+    Tras procesar, las tomas de espectro quedan en self.taps por nombre.
+    """
+
+    def __init__(self, stages):
+        self.stages = [dict(stage) for stage in stages]
+        for stage in self.stages:
+            _check_stage(stage)
+        self.taps = {}
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Crea la cadena desde texto ("high:300,notch:60,gain:-3") o, si spec
+        es la ruta de un archivo .json, desde el archivo.
+        """
+        if spec.endswith('.json'):
+            return cls.load(spec)
+        return cls([parse_stage(text) for text in spec.split(',') if text.strip()])
+
+    def to_dict(self):
+        return {'version': PIPELINE_VERSION, 'etapas': self.stages}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version', PIPELINE_VERSION) > PIPELINE_VERSION:
+            raise ValueError("Cadena guardada con una versión más nueva")
+        return cls(data['etapas'])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def output_rate(self, sample_rate):
+        """
+        Frecuencia de muestreo a la salida de la cadena.
+        """
+        for stage in self.stages:
+            if stage['tipo'] == 'resample':
+                up, down = resample_ratio(sample_rate, stage['frecuencia'])
+                sample_rate = sample_rate * up / down
+        return sample_rate
+
+    def _groups(self, sample_rate, zero_phase):
+        # Agrupa las etapas en operaciones: las IIR contiguas forman una sola
+        # cascada; en modo causal la ganancia se incorpora a la cascada.
+        ops = []
+        sos_group = []
+        gain = 1.0
+
+        def close_group():
+            nonlocal sos_group, gain
+            if sos_group:
+                sos = np.vstack(sos_group)
+                if not zero_phase:
+                    sos = sos.copy()
+                    sos[0, :3] *= gain
+                    gain = 1.0
+                ops.append(('iir', sos))
+                sos_group = []
+            if gain != 1.0:
+                ops.append(('gain', gain))
+                gain = 1.0
+
+        for stage in self.stages:
+            kind = stage['tipo']
+            if stage.get('motor') == 'fir':
+                close_group()
+                cutoff = tuple(stage['corte']) if kind == 'band' else stage['corte']
+                ops.append(('fir', design_fir(kind, sample_rate, cutoff,
+                                              stage.get('coeficientes', FIR_TAPS))))
+            elif kind in _IIR_TYPES:
+                if zero_phase and gain != 1.0:
+                    close_group()
+                sos_group.append(_stage_sos(stage, sample_rate))
+            elif kind == 'gain':
+                gain *= 10 ** (stage['db'] / 20)
+            else:
+                close_group()
+                if kind == 'resample':
+                    up, down = resample_ratio(sample_rate, stage['frecuencia'])
+                    ops.append(('resample', (up, down)))
+                    sample_rate = sample_rate * up / down
+                else:
+                    ops.append(('spectrum', (stage['nombre'], sample_rate,
+                                             stage.get('nperseg', 4096))))
+        close_group()
+        return ops
+
+    def stream(self, blocks, sample_rate, zero_phase=False, overlap=None, dtype=np.float64):
+        """
+        Aplica la cadena a una secuencia de bloques flotantes (muestras[,
+        canales]) y devuelve otra secuencia de bloques.
+
+        Con zero_phase=True cada cascada IIR se aplica con la aproximación de
+        fase cero por traslape (ver bloques.zero_phase_blocks). dtype es la
+        precisión de los bloques entre etapas; los coeficientes de los IIR y
+        el remuestreo se calculan en float64 y vuelven a dtype.
+        """
+        self.taps = {}
+        for kind, arg in self._groups(sample_rate, zero_phase):
+            if kind == 'iir':
+                blocks = _iir_op(blocks, arg, zero_phase, overlap, dtype)
+            elif kind == 'fir':
+                blocks = _fir_op(blocks, arg, zero_phase, dtype)
+            elif kind == 'gain':
+                blocks = _gain_op(blocks, arg, dtype)
+            elif kind == 'resample':
+                blocks = _resample_op(blocks, *arg, dtype)
+            else:
+                name, rate, nperseg = arg
+                tap = SpectrumTap(name, rate, nperseg)
+                self.taps[name] = tap
+                blocks = _tap_op(blocks, tap)
+        return blocks
+
+    def run(self, data, sample_rate, block_size=BLOCK_SIZE, zero_phase=False, dtype=np.float64):
+        """
+        Aplica la cadena a un arreglo completo y devuelve la salida en dtype.
+        """
+        data = np.asarray(data)
+        blocks = (_from_pcm(data[i:i + block_size], dtype) for i in range(0, len(data), block_size))
+        out = list(self.stream(blocks, sample_rate, zero_phase, dtype=dtype))
+        if not out:
+            return np.empty((0,) + data.shape[1:], dtype=dtype)
+        return np.concatenate(out)
+
+    def run_file(self, src, dst, block_size=BLOCK_SIZE, zero_phase=False, dtype=np.float64):
+        """
+        Aplica la cadena a un archivo WAV y escribe el resultado en dst con
+        el mismo formato de muestra, bloque a bloque.
+        """
+        wav_file = WavFile(src)
+        pcm_dtype = wav_file.dtype
+        blocks = (_from_pcm(wav_file.read_frames(i, i + block_size), dtype)
+                  for i in range(0, wav_file.frames, block_size))
+        out_rate = int(round(self.output_rate(wav_file.sample_rate)))
+        with WavWriter(dst, out_rate, wav_file.channels, pcm_dtype,
+                       wav_file.sampwidth) as out_file:
+            for block in self.stream(blocks, wav_file.sample_rate, zero_phase, dtype=dtype):
+                out_file.write(_to_pcm(block, pcm_dtype))
+
+
+def _iir_op(blocks, sos, zero_phase, overlap, dtype):
+    if zero_phase:
+        yield from zero_phase_blocks(blocks, sos, overlap or impulse_length(sos), dtype)
+        return
+    stream = StreamFilter(sos, dtype)
+    for block in blocks:
+        yield stream.process(block)
+
+
+def _fir_op(blocks, taps, zero_phase, dtype):
+    stream = StreamFIR(taps, dtype, zero_phase)
+    for block in blocks:
+        out = stream.process(block)
+        if len(out):
+            yield out
+    tail = stream.flush()
+    if len(tail):
+        yield tail
+
+
+def _gain_op(blocks, gain, dtype):
+    for block in blocks:
+        with stage('ganancia', block.nbytes):
+            block = np.array(block, dtype=dtype)
+            block *= gain
+        yield block
+
+
+def _resample_op(blocks, up, down, dtype):
+    resampler = StreamResampler(up, down)
+    for block in blocks:
+        out = resampler.process(block)
+        if len(out):
+            yield out.astype(dtype, copy=False)
+    tail = resampler.flush()
+    if len(tail):
+        yield tail.astype(dtype, copy=False)
+
+
+def _tap_op(blocks, tap):
+    for block in blocks:
+        tap.add(block)
+        yield block
@@ -0,0 +1,212 @@
+# Cliente del servidor de trabajos (dsp.servidor)
+#
+# Uso:
+#   python -m dsp.cliente salud
+#   python -m dsp.cliente metricas
+#   python -m dsp.cliente filtrar entrada.wav salida.wav -c "high:300,low:8000:6"
+#   python -m dsp.cliente fft entrada.wav --puntos 1024
+#   python -m dsp.cliente carga entrada.wav -c "low:1000" -n 200 -s 16
+#
+# Solo usa la biblioteca estándar, así puede llamarse desde otros sistemas
+# sin cargar numpy ni scipy. "carga" lanza muchos trabajos a la vez y
+# reporta el rendimiento y los rechazos, para probar el control de carga.
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8750
+
+
+class ServerError(Exception):
+    """
+    Respuesta de error del servidor; status es el código HTTP (503 si está
+    ocupado y conviene reintentar más tarde).
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class Client:
+    """
+    Cliente HTTP síncrono. Cada petición abre su propia conexión, así una
+    instancia puede usarse desde varios hilos.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, headers=None, params=None):
+        if params:
+            path += "?" + urlencode(params)
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        if response.status != 200:
+            data = response.read()
+            connection.close()
+            try:
+                message = json.loads(data)["error"]
+            except (ValueError, KeyError):
+                message = data.decode('utf-8', 'replace')
+            raise ServerError(response.status, message)
+        return connection, response
+
+    def _json(self, method, path, **kwargs):
+        connection, response = self._request(method, path, **kwargs)
+        try:
+            return json.loads(response.read())
+        finally:
+            connection.close()
+
+    def health(self):
+        return self._json("GET", "/salud")
+
+    def metrics(self):
+        return self._json("GET", "/metricas")
+
+    def filter(self, src, dst, chain, zero_phase=True, precision='float64'):
+        """
+        Envía el archivo src, lo filtra con la cadena chain (texto como en
+        dsp.lotes) y guarda el resultado en dst. Devuelve los bytes recibidos.
+        """
+        params = {"cadena": chain, "precision": precision}
+        if not zero_phase:
+            params["causal"] = "1"
+        with open(src, 'rb') as f:
+            headers = {"Content-Type": "audio/wav",
+                       "Content-Length": str(os.fstat(f.fileno()).st_size)}
+            connection, response = self._request("POST", "/filtrar", f, headers, params)
+        try:
+            with open(dst, 'wb') as out:
+                shutil.copyfileobj(response, out, 1 << 20)
+                return out.tell()
+        finally:
+            connection.close()
+
+    def filter_paths(self, src, dst, chain, zero_phase=True, precision='float64'):
+        """
+        Como filter, pero el servidor lee src y escribe dst directamente.
+        El servidor tiene que haberse arrancado con --raiz y ambas rutas
+        deben estar dentro de ese directorio. Devuelve la entrada del
+        resumen, como dsp.lotes.process_file.
+        """
+        body = json.dumps({"entrada": os.path.abspath(src), "salida": os.path.abspath(dst),
+                           "cadena": chain, "causal": not zero_phase,
+                           "precision": precision}).encode('utf-8')
+        return self._json("POST", "/filtrar", body=body,
+                          headers={"Content-Type": "application/json"})
+
+    def fft(self, src, points=None):
+        """
+        FFT de src calculada en el servidor: diccionario con "frecuencias" y
+        "magnitud" (una lista por canal).
+        """
+        params = {"puntos": points} if points else None
+        with open(src, 'rb') as f:
+            headers = {"Content-Type": "audio/wav",
+                       "Content-Length": str(os.fstat(f.fileno()).st_size)}
+            return self._json("POST", "/fft", body=f, headers=headers, params=params)
+
+
+def load_test(client, src, chain, count=100, concurrency=8, tmp_dir=None):
+    """
+    Envía count trabajos de filtrado de src con concurrency peticiones
+    simultáneas. Devuelve un diccionario con completados, rechazados,
+    errores, segundos y trabajos por segundo.
+    """
+    results = {"completados": 0, "rechazados": 0, "errores": 0}
+    latencies = []
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        def one(i):
+            start = time.perf_counter()
+            try:
+                client.filter(src, os.path.join(directory, f"{i % concurrency}.wav"), chain)
+                return "completados", time.perf_counter() - start
+            except ServerError as exc:
+                return ("rechazados" if exc.status == 503 else "errores"), None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for outcome, latency in pool.map(one, range(count)):
+                results[outcome] += 1
+                if latency is not None:
+                    latencies.append(latency)
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    results.update(
+        segundos=elapsed,
+        trabajos_por_segundo=results["completados"] / elapsed if elapsed else 0.0,
+        latencia_mediana=latencies[len(latencies) // 2] if latencies else 0.0,
+        latencia_maxima=latencies[-1] if latencies else 0.0)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dsp.cliente", description="Cliente del servidor de trabajos dsp.servidor.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="dirección del servidor")
+    parser.add_argument("-p", "--puerto", type=int, default=DEFAULT_PORT, help="puerto")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    commands.add_parser("salud", help="estado del servidor")
+    commands.add_parser("metricas", help="contadores y rendimiento")
+
+    filter_cmd = commands.add_parser("filtrar", help="filtrar un archivo WAV")
+    filter_cmd.add_argument("entrada")
+    filter_cmd.add_argument("salida")
+    fft_cmd = commands.add_parser("fft", help="FFT de un archivo WAV (JSON)")
+    fft_cmd.add_argument("entrada")
+    fft_cmd.add_argument("--puntos", type=int, default=None, help="valores por canal")
+    load_cmd = commands.add_parser("carga", help="prueba de carga con muchos trabajos")
+    load_cmd.add_argument("entrada")
+    load_cmd.add_argument("-n", type=int, default=100, help="número de trabajos")
+    load_cmd.add_argument("-s", "--simultaneos", type=int, default=8,
+                          help="peticiones simultáneas")
+    for cmd in (filter_cmd, load_cmd):
+        cmd.add_argument("-c", "--cadena", required=True, help='cadena, p. ej. "high:300,low:8000"')
+    filter_cmd.add_argument("--causal", action="store_true", help="filtrado causal")
+    filter_cmd.add_argument("--float32", action="store_true", help="calcular en precisión simple")
+    filter_cmd.add_argument("--rutas", action="store_true",
+                            help="el servidor lee y escribe los archivos directamente "
+                                 "(arrancado con --raiz)")
+    args = parser.parse_args(argv)
+
+    client = Client(args.host, args.puerto)
+    try:
+        if args.comando == "salud":
+            result = client.health()
+        elif args.comando == "metricas":
+            result = client.metrics()
+        elif args.comando == "filtrar":
+            method = client.filter_paths if args.rutas else client.filter
+            precision = "float32" if args.float32 else "float64"
+            result = method(args.entrada, args.salida, args.cadena, not args.causal, precision)
+            if not args.rutas:
+                result = {"salida": args.salida, "bytes": result}
+        elif args.comando == "fft":
+            result = client.fft(args.entrada, args.puntos)
+        else:
+            result = load_test(client, args.entrada, args.cadena, args.n, args.simultaneos)
+    except (ServerError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# Envolvente mín/máx de varias resoluciones para graficar señales largas
+#
+# Una gráfica no puede mostrar más puntos que píxeles, así que en lugar de
+# pasar todas las muestras se dibuja, para cada columna de píxeles, el
+# mínimo y el máximo de las muestras que le corresponden. La pirámide
+# guarda esos valores precalculados en varios niveles de detalle.
+
+import numpy as np
+
+from .perfil import profiled
+
+# Muestras por cubeta en el primer nivel y factor de reducción entre niveles
+BASE_BUCKET = 16
+LEVEL_FACTOR = 4
+
+# Por debajo de este número de cubetas ya no se crean más niveles
+MIN_BUCKETS = 1024
+
+
+def _reduce(mins, maxs, factor):
+    n = len(mins) // factor * factor
+    new_mins = mins[:n].reshape(-1, factor, *mins.shape[1:]).min(axis=1)
+    new_maxs = maxs[:n].reshape(-1, factor, *maxs.shape[1:]).max(axis=1)
+    if n < len(mins):  # Cubeta final incompleta
+        new_mins = np.concatenate([new_mins, mins[n:].min(axis=0, keepdims=True)])
+        new_maxs = np.concatenate([new_maxs, maxs[n:].max(axis=0, keepdims=True)])
+    return new_mins, new_maxs
+
+
+class MinMaxPyramid:
+    """
+    Pirámide de envolventes mín/máx de una señal (muestras[, canales]).
+
+    El nivel 0 es la señal original (sin copiar); el nivel k agrupa
+    BASE_BUCKET * LEVEL_FACTOR ** (k - 1) muestras por cubeta.
+    """
+
+    @profiled('envolvente')
+    def __init__(self, data, base_bucket=BASE_BUCKET, factor=LEVEL_FACTOR):
+        self.data = np.asarray(data)
+        self.frames = len(self.data)
+        self.buckets = [1]
+        self.levels = [(self.data, self.data)]
+        if self.frames <= base_bucket * MIN_BUCKETS:
+            return
+        mins, maxs = _reduce(self.data, self.data, base_bucket)
+        size = base_bucket
+        while True:
+            self.buckets.append(size)
+            self.levels.append((mins, maxs))
+            if len(mins) <= factor * MIN_BUCKETS:
+                break
+            mins, maxs = _reduce(mins, maxs, factor)
+            size *= factor
+
+    @property
+    def limits(self):
+        """
+        Mínimo y máximo globales de la señal.
+        """
+        mins, maxs = self.levels[-1]
+        return mins.min(), maxs.max()
+
+    @profiled('envolvente')
+    def envelope(self, first, last, width):
+        """
+        Puntos a graficar para las muestras [first, last) en un área de
+        width píxeles. Devuelve (posiciones, valores): las posiciones son
+        índices de muestra; en los niveles reducidos cada cubeta aporta dos
+        puntos (mínimo y máximo) en la misma posición.
+        """
+        first = max(0, int(first))
+        last = min(self.frames, int(np.ceil(last)))
+        if last <= first:
+            return np.empty(0), self.data[:0]
+        width = max(int(width), 1)
+        level = 0
+        for k, size in enumerate(self.buckets):
+            level = k
+            if (last - first) / size <= width:
+                break
+        size = self.buckets[level]
+        if size == 1:
+            return np.arange(first, last), self.data[first:last]
+
+        mins, maxs = self.levels[level]
+        b0 = first // size
+        b1 = min(len(mins), -(-last // size))
+        positions = (np.arange(b0, b1) + 0.5) * size
+        values = np.empty((2 * (b1 - b0),) + mins.shape[1:], dtype=mins.dtype)
+        values[0::2] = mins[b0:b1]
+        values[1::2] = maxs[b0:b1]
+        return np.repeat(positions, 2), values
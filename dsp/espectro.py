@@ -0,0 +1,156 @@
+# Transformada de Fourier de las señales de audio
+#
+# Las señales de audio son reales, así que se usa rfft (la mitad del
+# trabajo y de la memoria que fft) con la longitud rellenada a un tamaño
+# rápido para la FFT. scipy.fft reutiliza internamente los planes de las
+# longitudes ya calculadas y puede repartir el trabajo entre varios hilos.
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+
+from .perfil import profiled
+
+# Hilos de scipy.fft (-1 usa todos los núcleos)
+FFT_WORKERS = -1
+
+# Segmento y salto por defecto para Welch y el espectrograma
+NPERSEG = 4096
+HOP = 2048
+
+
+@profiled('fft')
+def compute_fft(signal_data, sample_rate, axis=0, fast_len=True, workers=FFT_WORKERS):
+    """
+    Aplica la Transformada de Fourier a la señal de audio y devuelve
+    las frecuencias positivas y su magnitud.
+
+    Con un arreglo (muestras, canales) se transforman todos los canales a
+    la vez; la magnitud conserva un canal por columna. Con fast_len la señal
+    se rellena con ceros hasta la siguiente longitud rápida, lo que evita
+    los casos lentos (longitudes primas) a cambio de una rejilla de
+    frecuencias ligeramente más fina.
+    """
+    signal_data = np.asarray(signal_data)
+    n = signal_data.shape[axis]
+    nfft = sp_fft.next_fast_len(n, real=True) if fast_len and n else n
+    freq = sp_fft.rfftfreq(nfft, d=1/sample_rate)
+    spectrum = sp_fft.rfft(signal_data, n=nfft, axis=axis, workers=workers)
+    index = [slice(None)] * spectrum.ndim
+    index[axis] = slice(0, nfft // 2)
+    return freq[:nfft//2], np.abs(spectrum[tuple(index)])
+
+
+@profiled('psd')
+def welch_psd(signal_data, sample_rate, nperseg=NPERSEG, hop=HOP, window='hann', axis=0):
+    """
+    Densidad espectral de potencia por el método de Welch.
+
+    Promedia los espectros de segmentos de nperseg muestras separados por
+    hop muestras, así que el resultado tiene nperseg // 2 + 1 puntos sin
+    importar la duración de la señal.
+    """
+    signal_data = np.asarray(signal_data)
+    nperseg = min(nperseg, signal_data.shape[axis])
+    noverlap = max(nperseg - hop, 0)
+    return signal.welch(signal_data, fs=sample_rate, window=window, nperseg=nperseg,
+                        noverlap=noverlap, axis=axis)
+
+
+@profiled('espectrograma')
+def spectrogram(signal_data, sample_rate, nperseg=NPERSEG, hop=HOP, window='hann', axis=0):
+    """
+    Espectrograma (magnitud de la STFT). Devuelve (frecuencias, tiempos,
+    magnitud); la magnitud tiene las frecuencias en el primer eje y los
+    tiempos en el último, con los canales, si los hay, en medio.
+    """
+    signal_data = np.moveaxis(np.asarray(signal_data), axis, -1)
+    nperseg = min(nperseg, signal_data.shape[-1])
+    noverlap = max(nperseg - hop, 0)
+    freq, times, stft = signal.stft(signal_data, fs=sample_rate, window=window,
+                                    nperseg=nperseg, noverlap=noverlap, axis=-1)
+    return freq, times, np.moveaxis(np.abs(stft), -2, 0)
+
+
+class SlidingSpectrogram:
+    """
+    Espectrograma deslizante para audio en vivo.
+
+    push() recibe bloques de cualquier tamaño y calcula solo los segmentos
+    nuevos; las últimas history columnas (en dB, float32) se guardan en un
+    búfer circular, así la memoria y el costo por bloque no dependen de
+    cuánto tiempo lleve corriendo. Los bloques con varios canales se
+    mezclan a mono.
+    """
+
+    def __init__(self, sample_rate, nperseg=2048, hop=512, history=400, window='hann',
+                 floor_db=-120.0):
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        self.hop = hop
+        self.history = history
+        self.floor_db = floor_db
+        self.window = signal.get_window(window, nperseg).astype(np.float32)
+        # Una senoidal de amplitud 1 queda en 0 dB
+        self._scale = np.float32(2 / self.window.sum())
+        self.freq = sp_fft.rfftfreq(nperseg, 1 / sample_rate)
+        self.columns = np.full((len(self.freq), history), floor_db, dtype=np.float32)
+        self.head = 0  # Columna donde va el siguiente segmento
+        self.frames = 0  # Segmentos calculados desde el inicio
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    @property
+    def seconds(self):
+        """
+        Duración que abarca el historial.
+        """
+        return self.history * self.hop / self.sample_rate
+
+    def reset(self):
+        self.columns.fill(self.floor_db)
+        self.head = 0
+        self.frames = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    @profiled('espectrograma')
+    def push(self, block):
+        """
+        Agrega un bloque (muestras[, canales]) y devuelve cuántos segmentos
+        nuevos se calcularon.
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        data = np.concatenate([self._pending, block])
+        n = (len(data) - self.nperseg) // self.hop + 1 if len(data) >= self.nperseg else 0
+        if not n:
+            self._pending = data
+            return 0
+        # Si llega más de lo que cabe en el historial solo se calculan los
+        # últimos segmentos
+        first = max(0, n - self.history)
+        segments = np.lib.stride_tricks.sliding_window_view(data, self.nperseg)
+        segments = segments[first * self.hop:n * self.hop:self.hop] * self.window
+        magnitude = np.abs(sp_fft.rfft(segments, axis=1)) * self._scale
+        db = 20 * np.log10(np.maximum(magnitude, 1e-12, out=magnitude), out=magnitude)
+        np.maximum(db, self.floor_db, out=db)
+
+        index = (self.head + np.arange(n - first)) % self.history
+        self.columns[:, index] = db.T
+        self.head = (self.head + n - first) % self.history
+        self.frames += n
+        self._pending = data[n * self.hop:].copy()
+        return n
+
+    def image(self, out=None):
+        """
+        Historial ordenado del segmento más antiguo al más reciente, con
+        forma (frecuencias, history). out evita reservar memoria en cada
+        cuadro.
+        """
+        if out is None:
+            out = np.empty_like(self.columns)
+        tail = self.history - self.head
+        out[:, :tail] = self.columns[:, self.head:]
+        out[:, tail:] = self.columns[:, :self.head]
+        return out
@@ -0,0 +1,156 @@
+# Filtros Butterworth compartidos por todas las interfaces
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+
+from .fir import FIR_TAPS, design_fir, fir_filter
+from .perfil import profiled
+
+# Número máximo de diseños que se conservan en memoria
+FILTER_CACHE_SIZE = 128
+
+# Motores de filtrado: Butterworth IIR con sosfiltfilt o FIR de fase lineal
+# con convolución por FFT (ver fir.py)
+ENGINES = ('iir', 'fir')
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+@profiled('diseño')
+def _butter_sos(btype, order, normal_cutoff, sample_rate):
+    # La frecuencia de muestreo forma parte de la clave junto con los cortes
+    # normalizados, aunque el diseño digital solo dependa de estos últimos.
+    # El arreglo devuelto se comparte entre llamadas: no debe modificarse.
+    return signal.butter(order, normal_cutoff, btype=btype, analog=False, output='sos')
+
+
+def design_filter(btype, sample_rate, cutoff, order):
+    """
+    Devuelve las secciones de segundo orden (SOS) de un filtro Butterworth.
+
+    btype es 'low', 'high' o 'band'; cutoff es una frecuencia en Hz o un par
+    (baja, alta) para el pasa banda. Los diseños se guardan en una caché LRU
+    acotada, así que repetir los mismos parámetros no vuelve a llamar a butter.
+    """
+    nyquist = 0.5 * sample_rate
+    if np.ndim(cutoff):
+        normal_cutoff = tuple(float(c) / nyquist for c in cutoff)
+    else:
+        normal_cutoff = float(cutoff) / nyquist
+    return _butter_sos(btype, int(order), normal_cutoff, float(sample_rate))
+
+
+def filter_cache_info():
+    """
+    Estadísticas de la caché de diseños (aciertos, fallos, tamaño).
+    """
+    return _butter_sos.cache_info()
+
+
+def clear_filter_cache():
+    """
+    Vacía la caché de diseños de filtros.
+    """
+    _butter_sos.cache_clear()
+
+
+def _apply(btype, sample_rate, cutoff, order, signal_data, axis, dtype, engine, numtaps):
+    if engine == 'fir':
+        taps = design_fir(btype, sample_rate, cutoff, numtaps or FIR_TAPS)
+        return fir_filter(taps, signal_data, axis, dtype)
+    if engine != 'iir':
+        raise ValueError(f"Motor desconocido: {engine!r} (opciones: {', '.join(ENGINES)})")
+    return _filtfilt(design_filter(btype, sample_rate, cutoff, order), signal_data, axis, dtype)
+
+
+def _filtfilt(sos, signal_data, axis, dtype):
+    # Los coeficientes y el estado se quedan en float64: en float32 un
+    # Butterworth de corte bajo pierde precisión o ni siquiera tiene estado
+    # inicial (sosfilt_zi singular). Solo la señal y la salida van en dtype.
+    dtype = np.dtype(dtype)
+    data = np.asarray(signal_data)
+    if dtype == np.float64:
+        return _sosfiltfilt(sos, data.astype(dtype, copy=False), axis)
+    # Con coeficientes float64, sosfiltfilt haría en float64 una copia
+    # entera de la señal: se filtra por bloques con traslape (como
+    # bloques.filter_array) y solo el bloque en curso está en float64
+    from .bloques import BLOCK_SIZE, impulse_length, zero_phase_blocks
+    out = np.empty(data.shape, dtype=dtype)
+    source, target = np.moveaxis(data, axis, 0), np.moveaxis(out, axis, 0)
+    overlap = impulse_length(sos)
+    block_size = max(BLOCK_SIZE, overlap)
+    blocks = (source[i:i + block_size].astype(dtype) for i in range(0, len(source), block_size))
+    done = 0
+    for block in zero_phase_blocks(blocks, sos, overlap, dtype):
+        target[done:done + len(block)] = block
+        done += len(block)
+    return out
+
+
+@profiled('filtro')
+def _sosfiltfilt(sos, data, axis):
+    return signal.sosfiltfilt(sos, data, axis=axis)
+
+
+def lowpass_filter(signal_data, sample_rate, cutoff_freq, order=5, axis=0, dtype=np.float64,
+                   engine='iir', numtaps=None):
+    """
+    Aplica un filtro pasa baja a una señal de audio.
+
+    La señal puede ser mono o un arreglo (muestras, canales): todos los
+    canales se filtran en una sola llamada a lo largo del eje axis. Con
+    dtype=np.float32 la señal y el resultado van en precisión simple y se
+    filtra por bloques con traslape (ver bloques.zero_phase_blocks), así
+    solo un bloque a la vez se calcula en float64, con los coeficientes; la
+    diferencia relativa con sosfiltfilt es del orden de 1e-6.
+
+    engine='iir' usa un Butterworth de orden order con sosfiltfilt;
+    engine='fir' usa un FIR de fase lineal de numtaps coeficientes (por
+    defecto FIR_TAPS) con convolución por FFT, mejor para transiciones
+    abruptas.
+    """
+    return _apply('low', sample_rate, cutoff_freq, order, signal_data, axis, dtype,
+                  engine, numtaps)
+
+
+def highpass_filter(signal_data, sample_rate, cutoff_freq, order=10, axis=0, dtype=np.float64,
+                    engine='iir', numtaps=None):
+    """
+    Aplica un filtro pasa alta a una señal de audio.
+    """
+    return _apply('high', sample_rate, cutoff_freq, order, signal_data, axis, dtype,
+                  engine, numtaps)
+
+
+def bandpass_filter(signal_data, sample_rate, low_cutoff, high_cutoff, order=5, axis=0,
+                    dtype=np.float64, engine='iir', numtaps=None):
+    """
+    Aplica un filtro pasa banda a una señal de audio.
+    """
+    return _apply('band', sample_rate, (low_cutoff, high_cutoff), order, signal_data, axis,
+                  dtype, engine, numtaps)
+
+
+def filter_bank(signal_data, sample_rate, specs, axis=0, max_workers=None, dtype=np.float64,
+                engine='iir'):
+    """
+    Aplica varios filtros a la misma señal y devuelve una salida por filtro.
+
+    specs es una lista de tuplas (tipo, corte, orden) como las de
+    design_filter; con engine='fir' el tercer elemento es el número de
+    coeficientes. La señal se convierte a dtype una sola vez y los
+    filtros se ejecutan en hilos: sosfiltfilt y las FFT de oaconvolve
+    liberan el GIL, así que las bandas se calculan en paralelo.
+    """
+    data = np.ascontiguousarray(signal_data, dtype=dtype)
+
+    def run(spec):
+        btype, cutoff, order = spec
+        return _apply(btype, sample_rate, cutoff, order, data, axis, dtype, engine, order)
+
+    if len(specs) == 1:
+        return [run(specs[0])]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run, specs))
@@ -0,0 +1,342 @@
+# Índice de características espectrales de bibliotecas de audio
+#
+# Uso:
+#   python -m dsp.indice construir grabaciones/ -o indice/ -r -j 8
+#   python -m dsp.indice consultar indice/ --banda 1000-10000 -n 20
+#
+# Cada archivo se recorre una sola vez, por bloques, para calcular unas
+# pocas características: energía en las bandas baja/media/alta de
+# analisis_seniales, una PSD de Welch reducida a bandas logarítmicas, las
+# envolventes RMS y de pico y el centroide espectral. Se guardan por
+# columnas en fragmentos .npz con un manifiesto JSON, así una consulta
+# sobre decenas de miles de archivos es una operación vectorizada sobre
+# unos pocos arreglos y no vuelve a leer el audio.
+#
+# Reconstruir el índice solo procesa los archivos nuevos o modificados.
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .bloques import BLOCK_SIZE
+from .cadena import SpectrumTap
+from .lotes import find_inputs
+from .wav import WavFile, pcm_to_float
+
+INDEX_VERSION = 3
+MANIFEST_NAME = "manifiesto.json"
+
+# Cortes de las bandas baja / media / alta (Hz), los de analisis_seniales
+BAND_CUTOFFS = (1000.0, 10000.0)
+
+# Bordes de las bandas logarítmicas de la PSD reducida (Hz), hasta el
+# Nyquist de 192 kHz; en cada archivo las bandas por encima de su Nyquist
+# quedan en cero
+PSD_EDGES = np.geomspace(20.0, 96000.0, 73)
+
+# Puntos de las envolventes RMS y de pico de cada archivo
+ENVELOPE_POINTS = 256
+
+# Segmento de Welch
+NPERSEG = 4096
+
+# Archivos por fragmento
+SHARD_SIZE = 4096
+
+# Columnas escalares y su tipo; además están 'ruta' (texto), 'psd' y las
+# envolventes 'rms_envolvente' y 'pico_envolvente' (una fila por archivo)
+SCALAR_COLUMNS = {
+    'tamano': np.int64, 'mtime': np.int64, 'duracion': np.float64, 'frecuencia': np.float64,
+    'canales': np.int32, 'rms': np.float32, 'pico': np.float32, 'centroide': np.float32,
+    'energia_baja': np.float32, 'energia_media': np.float32, 'energia_alta': np.float32,
+    'energia_total': np.float32,
+}
+ARRAY_COLUMNS = ('psd', 'rms_envolvente', 'pico_envolvente')
+
+
+def _band_powers(freq, psd, edges):
+    # Potencia entre cada par de bordes integrando la PSD; la integral
+    # acumulada se interpola, así las bandas más angostas que un bin
+    # reciben su parte proporcional
+    df = freq[1] - freq[0]
+    cumulative = np.concatenate([[0.0], np.cumsum(psd) * df])
+    bin_edges = np.concatenate([freq - df / 2, [freq[-1] + df / 2]])
+    return np.diff(np.interp(edges, bin_edges, cumulative))
+
+
+def file_features(path, block_size=BLOCK_SIZE):
+    """
+    Calcula las características de un archivo WAV recorriéndolo por
+    bloques. Devuelve un diccionario con una entrada por columna.
+    """
+    wav_file = WavFile(path)
+    stat = os.stat(path)
+    frames, channels, sample_rate = wav_file.frames, wav_file.channels, wav_file.sample_rate
+
+    # Las envolventes agrupan seg muestras por punto; los bloques se
+    # redondean a un múltiplo de seg para que cada punto caiga en un bloque
+    seg = max(1, -(-frames // ENVELOPE_POINTS))
+    block = max(seg, block_size // seg * seg)
+    sum_sq = np.zeros(ENVELOPE_POINTS)
+    peaks = np.zeros(ENVELOPE_POINTS, dtype=np.float32)
+    counts = np.zeros(ENVELOPE_POINTS)
+    nperseg = min(NPERSEG, 1 << max(4, int(np.log2(max(frames, 1)))))
+    tap = SpectrumTap('psd', sample_rate, nperseg)
+
+    for first in range(0, frames, block):
+        data = pcm_to_float(wav_file.read_frames(first, first + block), np.float32)
+        tap.add(data.mean(axis=1))  # La PSD se calcula sobre la mezcla mono
+        starts = np.arange(0, len(data), seg)
+        index = first // seg + np.arange(len(starts))
+        sum_sq[index] = np.add.reduceat((data.astype(np.float64) ** 2).sum(axis=1), starts)
+        peaks[index] = np.maximum.reduceat(np.abs(data).max(axis=1), starts)
+        counts[index] = np.diff(np.append(starts, len(data))) * channels
+
+    features = {
+        'ruta': os.path.abspath(path), 'tamano': stat.st_size, 'mtime': stat.st_mtime_ns,
+        'duracion': frames / sample_rate, 'frecuencia': sample_rate, 'canales': channels,
+        'rms': np.sqrt(sum_sq.sum() / max(counts.sum(), 1)), 'pico': peaks.max(initial=0.0),
+        'rms_envolvente': np.sqrt(sum_sq / np.maximum(counts, 1)).astype(np.float32),
+        'pico_envolvente': peaks,
+    }
+    freq, psd = tap.result()
+    if psd is None:  # Archivo más corto que el segmento mínimo
+        psd = np.zeros(len(freq))
+    # Con Nyquist por debajo de un corte (grabaciones de 8 o 16 kHz) los
+    # bordes se recortan a Nyquist y las bandas que quedan fuera valen 0
+    nyquist = sample_rate / 2
+    bands = _band_powers(freq, psd, np.minimum([0.0, *BAND_CUTOFFS, nyquist], nyquist))
+    total = psd.sum()
+    features.update(
+        energia_baja=bands[0], energia_media=bands[1], energia_alta=bands[2],
+        energia_total=bands.sum(),
+        centroide=(freq * psd).sum() / total if total else 0.0,
+        psd=_band_powers(freq, psd, PSD_EDGES).astype(np.float32),
+    )
+    return features
+
+
+def _empty_columns(psd_bands=len(PSD_EDGES) - 1):
+    columns = {name: np.empty(0, dtype=dtype) for name, dtype in SCALAR_COLUMNS.items()}
+    columns['ruta'] = np.empty(0, dtype=str)
+    columns['psd'] = np.empty((0, psd_bands), dtype=np.float32)
+    columns['rms_envolvente'] = np.empty((0, ENVELOPE_POINTS), dtype=np.float32)
+    columns['pico_envolvente'] = np.empty((0, ENVELOPE_POINTS), dtype=np.float32)
+    return columns
+
+
+def _rows_to_columns(rows):
+    columns = _empty_columns()
+    if not rows:
+        return columns
+    for name, empty in columns.items():
+        dtype = str if name == 'ruta' else empty.dtype
+        columns[name] = np.array([row[name] for row in rows], dtype=dtype)
+    return columns
+
+
+class SpectralIndex:
+    """
+    Índice de características cargado en memoria: un arreglo por columna
+    (ver SCALAR_COLUMNS y ARRAY_COLUMNS), con una fila por archivo.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version', INDEX_VERSION) > INDEX_VERSION:
+            raise ValueError("Índice creado con una versión más nueva")
+        self.psd_edges = np.asarray(self.manifest['psd_bordes'])
+        parts = []
+        for shard in self.manifest['fragmentos']:
+            with np.load(os.path.join(directory, shard['archivo'])) as data:
+                parts.append({name: data[name] for name in data.files})
+        empty = _empty_columns(len(self.psd_edges) - 1)
+        self.columns = {name: np.concatenate([empty[name]] + [p[name] for p in parts])
+                        for name in empty}
+
+    def __len__(self):
+        return len(self.columns['ruta'])
+
+    @property
+    def paths(self):
+        return self.columns['ruta']
+
+    def band_energy(self, low, high):
+        """
+        Energía de cada archivo entre low y high (Hz) a partir de la PSD
+        reducida; las bandas que el intervalo corta se cuentan en proporción.
+        """
+        edges = self.psd_edges
+        overlap = np.clip(np.minimum(edges[1:], high) - np.maximum(edges[:-1], low), 0, None)
+        return self.columns['psd'] @ (overlap / np.diff(edges)).astype(np.float32)
+
+    def top(self, values, n=10, ascending=False):
+        """
+        Los n archivos con los valores más altos (o más bajos) de values,
+        que puede ser el nombre de una columna escalar o un arreglo con un
+        valor por archivo. Devuelve una lista de (ruta, valor).
+        """
+        if isinstance(values, str):
+            values = self.columns[values]
+        values = np.asarray(values)
+        n = min(n, len(values))
+        if not n:
+            return []
+        keys = values if ascending else -values
+        best = np.argpartition(keys, n - 1)[:n]
+        best = best[np.argsort(keys[best])]
+        return [(str(self.paths[i]), float(values[i])) for i in best]
+
+    def query_band(self, low, high, n=10, relative=True):
+        """
+        Los n archivos con más energía entre low y high (Hz). Con relative
+        la energía se divide entre la de todo el intervalo que cubre la PSD
+        reducida en cada archivo, así no ganan solo las grabaciones más
+        fuertes y se comparan igual archivos de distinta frecuencia de
+        muestreo.
+        """
+        energy = self.band_energy(low, high)
+        if relative:
+            total = self.columns['psd'].sum(axis=1)
+            energy = np.divide(energy, total, out=np.zeros_like(energy), where=total > 0)
+        return self.top(energy, n)
+
+
+def _write_index(directory, columns, shard_size=SHARD_SIZE):
+    # Los fragmentos nuevos llevan otro número de generación: el manifiesto
+    # anterior sigue siendo válido hasta que se sustituye el archivo
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    old_shards = []
+    generation = 0
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            old = json.load(f)
+        old_shards = [s['archivo'] for s in old['fragmentos']]
+        generation = old.get('generacion', 0) + 1
+
+    shards = []
+    total = len(columns['ruta'])
+    for number, first in enumerate(range(0, total, shard_size)):
+        name = f"fragmento_{generation:04d}_{number:04d}.npz"
+        np.savez(os.path.join(directory, name),
+                 **{key: value[first:first + shard_size] for key, value in columns.items()})
+        shards.append({"archivo": name, "filas": min(shard_size, total - first)})
+
+    manifest = {
+        "version": INDEX_VERSION, "generacion": generation, "archivos": total,
+        "cortes": list(BAND_CUTOFFS), "psd_bordes": PSD_EDGES.tolist(),
+        "envolvente_puntos": ENVELOPE_POINTS, "fragmentos": shards,
+    }
+    tmp = manifest_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, manifest_path)
+    for name in old_shards:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def build_index(inputs, directory, jobs=None, block_size=BLOCK_SIZE, shard_size=SHARD_SIZE,
+                log=print):
+    """
+    Agrega al índice de directory las características de los archivos
+    inputs. Los que ya están con el mismo tamaño y fecha se conservan sin
+    volver a leerlos, igual que las entradas de archivos que siguen
+    existiendo aunque no estén en inputs. Devuelve el número de archivos
+    procesados.
+    """
+    os.makedirs(directory, exist_ok=True)
+    try:
+        index = SpectralIndex(directory)
+        current = index.columns
+        # Las filas de otra versión o con otros bordes de la PSD no se
+        # pueden mezclar con las nuevas: se recalcula todo
+        if (index.manifest.get('version') != INDEX_VERSION
+                or not np.array_equal(index.psd_edges, PSD_EDGES)):
+            current = _empty_columns()
+    except FileNotFoundError:
+        current = _empty_columns()
+
+    known = {path: i for i, path in enumerate(current['ruta'])}
+    pending = []
+    for src in inputs:
+        path = os.path.abspath(src)
+        stat = os.stat(path)
+        i = known.get(path)
+        if (i is None or current['tamano'][i] != stat.st_size
+                or current['mtime'][i] != stat.st_mtime_ns):
+            pending.append(path)
+    changed = set(pending)
+    keep = [i for i, path in enumerate(current['ruta'])
+            if path not in changed and os.path.exists(path)]
+
+    rows = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(file_features, path, block_size): path for path in pending}
+        for future in as_completed(futures):
+            try:
+                rows.append(future.result())
+            except Exception as exc:
+                log(f"error    {futures[future]}: {type(exc).__name__}: {exc}")
+    rows.sort(key=lambda row: row['ruta'])
+
+    new = _rows_to_columns(rows)
+    columns = {name: np.concatenate([current[name][keep], new[name]]) for name in new}
+    _write_index(directory, columns, shard_size)
+    log(f"{len(rows)} procesados, {len(keep)} sin cambios en "
+        f"{time.perf_counter() - start:.2f} s ({len(columns['ruta'])} en el índice)")
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dsp.indice",
+        description="Índice de características espectrales de archivos WAV.")
+    commands = parser.add_subparsers(dest="comando", required=True)
+
+    build = commands.add_parser("construir", help="crear o actualizar el índice")
+    build.add_argument("entradas", nargs='+', help="directorios o patrones glob de archivos WAV")
+    build.add_argument("-o", "--indice", required=True, help="directorio del índice")
+    build.add_argument("-j", "--procesos", type=int, default=None,
+                       help="número de procesos (por defecto, uno por núcleo)")
+    build.add_argument("-r", "--recursivo", action="store_true",
+                       help="buscar archivos WAV en subdirectorios")
+
+    query = commands.add_parser("consultar", help="archivos con más energía en una banda")
+    query.add_argument("indice", help="directorio del índice")
+    query.add_argument("--banda", default="1000-10000", help="intervalo en Hz, p. ej. 1000-10000")
+    query.add_argument("-n", type=int, default=10, help="número de resultados")
+    query.add_argument("--absoluta", action="store_true",
+                       help="ordenar por energía absoluta y no por fracción del total")
+    args = parser.parse_args(argv)
+
+    if args.comando == "construir":
+        inputs = find_inputs(args.entradas, args.recursivo)
+        if not inputs:
+            parser.error("no se encontraron archivos WAV")
+        build_index(inputs, args.indice, args.procesos)
+        return 0
+
+    low, high = (float(f) for f in args.banda.split('-'))
+    index = SpectralIndex(args.indice)
+    start = time.perf_counter()
+    results = index.query_band(low, high, args.n, relative=not args.absoluta)
+    elapsed = time.perf_counter() - start
+    for path, value in results:
+        print(f"{value:12.4g}  {path}")
+    print(f"{len(index)} archivos consultados en {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
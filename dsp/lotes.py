@@ -0,0 +1,249 @@
+# Procesamiento por lotes desde la línea de comandos
+#
+# Uso:
+#   python -m dsp.lotes grabaciones/ -o salida/ -c "high:300,low:8000:6" -j 8
+#
+# Cada archivo WAV de entrada pasa por la cadena indicada (texto o un .json
+# guardado con Pipeline.save) y se escribe en el directorio de salida con la
+# misma ruta relativa a la carpeta común de las entradas (con -r se repiten
+# las subcarpetas); las tomas de espectro de la cadena se guardan junto a él en
+# un .npz. Los archivos se
+# reparten entre un grupo de procesos y al terminar se guarda un resumen
+# en resumen.json con el tiempo y el estado de cada uno. Con --perfil el
+# resumen incluye además el tiempo, los bytes y la memoria de cada etapa
+# (carga, conversión, filtro, guardado...) por archivo y en total.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from . import perfil
+from .bloques import BLOCK_SIZE
+from .cadena import Pipeline
+from .wav import WavFile
+
+SUMMARY_NAME = "resumen.json"
+
+
+def find_inputs(paths, recursive=False, exclude=None):
+    """
+    Expande directorios y patrones glob a la lista ordenada de archivos WAV.
+    Los archivos dentro del directorio exclude (p. ej. el de salida, si está
+    dentro de una entrada) se omiten.
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, '**', '*.wav') if recursive else os.path.join(path, '*.wav')
+            found.update(glob.glob(pattern, recursive=recursive))
+        else:
+            found.update(glob.glob(path, recursive=recursive))
+    found = (p for p in found if os.path.isfile(p))
+    if exclude is not None:
+        skipped = os.path.join(os.path.realpath(exclude), '')
+        roots = {os.path.join(os.path.realpath(p), '') for p in paths if os.path.isdir(p)}
+        # Si la salida es el propio directorio de entrada no se omite nada:
+        # run_batch rechaza entonces cada archivo que se sobrescribiría
+        if skipped not in roots:
+            found = (p for p in found if not os.path.realpath(p).startswith(skipped))
+    return sorted(found)
+
+
+def output_paths(inputs, out_dir):
+    """
+    Ruta de salida de cada entrada: la misma ruta relativa al directorio
+    común de las entradas, así dos archivos con el mismo nombre en carpetas
+    distintas no se pisan.
+    """
+    if not inputs:
+        return []
+    sources = [os.path.abspath(src) for src in inputs]
+    root = os.path.commonpath([os.path.dirname(src) for src in sources])
+    return [os.path.join(out_dir, os.path.relpath(src, root)) for src in sources]
+
+
+def process_file(src, dst, spec, block_size=BLOCK_SIZE, zero_phase=True, precision='float64',
+                 profile=False):
+    """
+    Procesa un archivo con la cadena spec (JSON de Pipeline) calculando en
+    la precisión indicada ('float64' o 'float32'). Devuelve una entrada del
+    resumen; con profile=True incluye las mediciones por etapa.
+    """
+    start = time.perf_counter()
+    entry = {"entrada": src, "salida": dst, "cadena": spec, "precision": precision}
+    # Se escribe en un temporal para no dejar salidas a medias que luego
+    # parezcan al día.
+    tmp = dst + ".tmp"
+    if profile:
+        perfil.enable(memory=True)
+    try:
+        wav_file = WavFile(src)
+        pipeline = Pipeline.from_json(spec)
+        pipeline.run_file(src, tmp, block_size, zero_phase, np.dtype(precision))
+        os.replace(tmp, dst)
+        if pipeline.taps:
+            spectra = {}
+            for name, tap in pipeline.taps.items():
+                spectra[name + "_frecuencia"], spectra[name + "_psd"] = tap.result()
+            np.savez(os.path.splitext(dst)[0] + "_espectros.npz", **spectra)
+        entry.update(estado="ok", muestras=wav_file.frames * wav_file.channels)
+    except Exception as exc:
+        entry.update(estado="error", error=f"{type(exc).__name__}: {exc}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    finally:
+        profiler = perfil.disable()
+        if profiler is not None:
+            entry["perfil"] = profiler.report()["etapas"]
+    entry["segundos"] = time.perf_counter() - start
+    return entry
+
+
+def _load_summary(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return {e["entrada"]: e for e in json.load(f)["archivos"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _is_up_to_date(src, dst, spec, precision, previous):
+    if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+        return False
+    entry = previous.get(src)
+    return (entry is not None and entry.get("estado") in ("ok", "omitido")
+            and entry.get("cadena") == spec
+            and entry.get("precision", "float64") == precision)
+
+
+def merge_profiles(entries):
+    """
+    Suma las mediciones por etapa de varias entradas del resumen (el pico
+    de memoria es el máximo).
+    """
+    total = {}
+    for entry in entries:
+        for name, stats in entry.get("perfil", {}).items():
+            acc = total.setdefault(name, {"llamadas": 0, "segundos": 0.0, "bytes": 0,
+                                          "memoria_pico": 0})
+            acc["llamadas"] += stats["llamadas"]
+            acc["segundos"] += stats["segundos"]
+            acc["bytes"] += stats["bytes"]
+            acc["memoria_pico"] = max(acc["memoria_pico"], stats["memoria_pico"])
+    for acc in total.values():
+        acc["mb_por_segundo"] = acc["bytes"] / acc["segundos"] / 1e6 if acc["segundos"] else 0.0
+    return dict(sorted(total.items(), key=lambda item: -item[1]["segundos"]))
+
+
+def run_batch(inputs, out_dir, spec, jobs=None, block_size=BLOCK_SIZE,
+              zero_phase=True, force=False, log=print, precision='float64', profile=False):
+    """
+    Procesa todos los archivos en paralelo y escribe el resumen en out_dir.
+    Devuelve la lista de entradas del resumen.
+    """
+    # La cadena se normaliza a JSON: falla antes de lanzar procesos si es
+    # inválida y dos escrituras equivalentes se reconocen como la misma
+    spec = Pipeline.from_spec(spec).to_json()
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, SUMMARY_NAME)
+    previous = {} if force else _load_summary(summary_path)
+
+    entries = []
+    pending = []
+    for src, dst in zip(inputs, output_paths(inputs, out_dir)):
+        if os.path.realpath(src) == os.path.realpath(dst):
+            entries.append({"entrada": src, "salida": dst, "cadena": spec, "precision": precision,
+                            "estado": "error", "segundos": 0.0,
+                            "error": "la salida sobrescribiría la entrada"})
+            log(f"error    {src}: la salida sobrescribiría la entrada")
+        elif not force and _is_up_to_date(src, dst, spec, precision, previous):
+            entries.append(dict(previous[src], estado="omitido", segundos=0.0))
+            log(f"omitido  {src}")
+        else:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            pending.append((src, dst))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(process_file, src, dst, spec, block_size, zero_phase,
+                               precision, profile)
+                   for src, dst in pending]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            if entry["estado"] == "ok":
+                log(f"ok       {entry['entrada']} ({entry['segundos']:.2f} s)")
+            else:
+                log(f"error    {entry['entrada']}: {entry['error']}")
+    elapsed = time.perf_counter() - start
+
+    entries.sort(key=lambda e: e["entrada"])
+    report = {
+        "cadena": spec,
+        "fase_cero": zero_phase,
+        "precision": precision,
+        "segundos": elapsed,
+        "procesados": sum(e["estado"] == "ok" for e in entries),
+        "omitidos": sum(e["estado"] == "omitido" for e in entries),
+        "errores": sum(e["estado"] == "error" for e in entries),
+        "archivos": entries,
+    }
+    if profile:
+        report["perfil"] = merge_profiles(e for e in entries if e["estado"] == "ok")
+        for name, stats in report["perfil"].items():
+            log(f"perfil   {name:<12} {stats['segundos']:8.3f} s {stats['llamadas']:7d} llamadas "
+                f"{stats['mb_por_segundo']:9.1f} MB/s {stats['memoria_pico'] / 2 ** 20:8.1f} MiB")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    log(f"{report['procesados']} procesados, {report['omitidos']} omitidos, "
+        f"{report['errores']} con error en {elapsed:.2f} s")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dsp.lotes",
+        description="Aplica una cadena de procesamiento a todos los WAV de un directorio o patrón.")
+    parser.add_argument("entradas", nargs='+', help="directorios o patrones glob de archivos WAV")
+    parser.add_argument("-o", "--salida", required=True, help="directorio de salida")
+    parser.add_argument("-c", "--cadena", required=True,
+                        help='cadena de etapas, por ejemplo "high:300,notch:60,gain:-3" o "low:1000:fir:2049", '
+                             'o un archivo .json con la cadena guardada')
+    parser.add_argument("-j", "--procesos", type=int, default=None,
+                        help="número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("-r", "--recursivo", action="store_true",
+                        help="buscar archivos WAV en subdirectorios")
+    parser.add_argument("--bloque", type=int, default=BLOCK_SIZE,
+                        help="muestras por bloque al leer y escribir")
+    parser.add_argument("--causal", action="store_true",
+                        help="filtrado causal en lugar de fase cero")
+    parser.add_argument("--float32", action="store_true",
+                        help="calcular en precisión simple (la mitad de memoria)")
+    parser.add_argument("--perfil", action="store_true",
+                        help="medir tiempo, bytes y memoria de cada etapa (en el resumen)")
+    parser.add_argument("--forzar", action="store_true",
+                        help="reprocesar aunque la salida esté al día")
+    args = parser.parse_args(argv)
+
+    try:
+        Pipeline.from_spec(args.cadena)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    inputs = find_inputs(args.entradas, args.recursivo, exclude=args.salida)
+    if not inputs:
+        parser.error("no se encontraron archivos WAV")
+    entries = run_batch(inputs, args.salida, args.cadena, args.procesos, args.bloque,
+                        not args.causal, args.forzar,
+                        precision='float32' if args.float32 else 'float64',
+                        profile=args.perfil)
+    return 1 if any(e["estado"] == "error" for e in entries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
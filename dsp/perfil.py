@@ -0,0 +1,185 @@
+# Medición opcional de tiempos por etapa
+#
+# Las funciones de carga, diseño, filtrado, FFT, guardado y graficación
+# están marcadas con @profiled o envueltas en stage(). Mientras la medición
+# está apagada (lo normal) cada llamada solo comprueba una variable global;
+# con enable() se acumulan por etapa las llamadas, el tiempo de reloj, los
+# bytes procesados y, opcionalmente, el pico de memoria reservada.
+#
+#     from dsp import perfil
+#     perfil.enable(memory=True)
+#     ...
+#     print(perfil.current().summary())
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+import numpy as np
+
+_profiler = None  # Profiler activo; None = medición apagada
+_NULL = nullcontext()
+
+
+class Profiler:
+    """
+    Acumula estadísticas por nombre de etapa. Es seguro usarlo desde varios
+    hilos. Con memory=True se activa tracemalloc; los picos de etapas
+    anidadas o simultáneas son aproximados.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def add(self, name, seconds, nbytes=0, peak=0):
+        with self._lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = {"llamadas": 0, "segundos": 0.0, "bytes": 0,
+                                             "memoria_pico": 0}
+            entry["llamadas"] += 1
+            entry["segundos"] += seconds
+            entry["bytes"] += nbytes
+            entry["memoria_pico"] = max(entry["memoria_pico"], peak)
+
+    def measure(self, name, nbytes=0):
+        """
+        Contexto que mide una etapa: with profiler.measure('fft', x.nbytes).
+        """
+        return _Measure(self, name, nbytes)
+
+    def report(self):
+        """
+        Reporte serializable en JSON: estadísticas por etapa, ordenadas de
+        mayor a menor tiempo, y el tiempo total desde que se activó.
+        """
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        for entry in stages.values():
+            seconds = entry["segundos"]
+            entry["mb_por_segundo"] = entry["bytes"] / seconds / 1e6 if seconds else 0.0
+        ordered = dict(sorted(stages.items(), key=lambda item: -item[1]["segundos"]))
+        return {"segundos": time.perf_counter() - self.start, "etapas": ordered}
+
+    def summary(self, limit=4):
+        """
+        Una línea con las etapas que más tiempo llevan, para una barra de estado.
+        """
+        stages = self.report()["etapas"]
+        if not stages:
+            return "Sin mediciones"
+        parts = []
+        for name, entry in list(stages.items())[:limit]:
+            text = f"{name} {entry['segundos'] * 1000:.0f} ms"
+            if entry["memoria_pico"] >= 2 ** 20:
+                text += f" ({entry['memoria_pico'] / 2 ** 20:.0f} MiB)"
+            parts.append(text)
+        return " · ".join(parts)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+
+class _Measure:
+    __slots__ = ('profiler', 'name', 'nbytes', 't0', 'mem0')
+
+    def __init__(self, profiler, name, nbytes):
+        self.profiler = profiler
+        self.name = name
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        if self.profiler.memory:
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.t0
+        peak = 0
+        if self.profiler.memory:
+            peak = max(0, tracemalloc.get_traced_memory()[1] - self.mem0)
+        self.profiler.add(self.name, seconds, self.nbytes, peak)
+        return False
+
+
+def enable(memory=False):
+    """
+    Activa la medición (reiniciando las estadísticas) y devuelve el Profiler.
+    """
+    global _profiler
+    disable()
+    _profiler = Profiler(memory)
+    return _profiler
+
+
+def disable():
+    """
+    Apaga la medición y devuelve el Profiler que estaba activo, si lo había.
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+def current():
+    return _profiler
+
+
+def stage(name, nbytes=0):
+    """
+    Contexto que mide un bloque de código si la medición está activa; si
+    no, no hace nada.
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _NULL
+    return profiler.measure(name, nbytes)
+
+
+def _nbytes(args, result):
+    # Bytes procesados: el mayor arreglo de los argumentos (la señal, no los
+    # coeficientes) o, si no hay ninguno, p. ej. al cargar, el del resultado
+    sizes = [value.nbytes for value in args if isinstance(value, np.ndarray)]
+    if sizes:
+        return max(sizes)
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    return result.nbytes if isinstance(result, np.ndarray) else 0
+
+
+def profiled(name):
+    """
+    Decorador que mide cada llamada a la función como la etapa name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.measure(name) as measure:
+                result = func(*args, **kwargs)
+                measure.nbytes = _nbytes(args, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,128 @@
+# Remuestreo polifásico por bloques
+#
+# StreamResampler reproduce exactamente scipy.signal.resample_poly (mismo
+# filtro FIR antialias y mismo alineamiento), pero procesando la señal por
+# bloques y guardando entre ellos solo las muestras que el filtro necesita.
+
+from fractions import Fraction
+from math import gcd
+
+import numpy as np
+from scipy import signal
+
+from .perfil import profiled
+
+# Para el análisis de una banda baja se muestrea a unas 4 veces su
+# frecuencia máxima: deja margen a la banda de transición del antialias.
+ANALYSIS_OVERSAMPLING = 4
+
+
+def resample_ratio(sample_rate, target_rate, max_denominator=1000):
+    """
+    Razón (up, down) racional más simple que lleva sample_rate a target_rate.
+    """
+    ratio = Fraction(target_rate / sample_rate).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+
+@profiled('remuestreo')
+def resample(signal_data, sample_rate, target_rate, axis=0):
+    """
+    Remuestrea la señal a target_rate con un filtro polifásico (con
+    antialias incluido). Devuelve (señal, nueva frecuencia de muestreo);
+    la nueva frecuencia puede diferir un poco de target_rate si la razón
+    no es racional con denominador pequeño.
+    """
+    up, down = resample_ratio(sample_rate, target_rate)
+    if up == down:
+        return np.asarray(signal_data), sample_rate
+    resampled = signal.resample_poly(signal_data, up, down, axis=axis)
+    return resampled, sample_rate * up / down
+
+
+@profiled('remuestreo')
+def decimate_for_band(signal_data, sample_rate, max_freq, axis=0):
+    """
+    Reduce la frecuencia de muestreo por un factor entero cuando solo
+    interesa el contenido por debajo de max_freq. Por ejemplo, 48 kHz con
+    max_freq = 1 kHz queda en 4 kHz: todas las etapas posteriores (filtros,
+    FFT) trabajan con 12 veces menos muestras.
+    """
+    factor = int(sample_rate // (ANALYSIS_OVERSAMPLING * max_freq))
+    if factor <= 1:
+        return np.asarray(signal_data), sample_rate
+    return signal.resample_poly(signal_data, 1, factor, axis=axis), sample_rate / factor
+
+
+class StreamResampler:
+    """
+    Cambia la frecuencia de muestreo en la razón up / down, bloque a bloque.
+
+    Al terminar la señal hay que llamar a flush() para obtener las últimas
+    muestras; la concatenación de todas las salidas coincide con
+    resample_poly(señal, up, down, axis=0).
+    """
+
+    def __init__(self, up, down, window=('kaiser', 5.0)):
+        g = gcd(int(up), int(down))
+        self.up = int(up) // g
+        self.down = int(down) // g
+        # Mismo diseño que resample_poly
+        max_rate = max(self.up, self.down)
+        half_len = 10 * max_rate
+        h = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=window) * self.up
+        n_pre_pad = self.down - half_len % self.down
+        self.h = np.concatenate([np.zeros(n_pre_pad), h])
+        self.skip = (half_len + n_pre_pad) // self.down
+
+        self.buffer = None  # Entradas desde el índice global self.start
+        self.start = 0
+        self.n_in = 0       # Entradas recibidas
+        self.m_next = 0     # Siguiente salida de upfirdn por calcular
+
+    def _first_input(self, m):
+        # Primera entrada que interviene en la salida m de upfirdn
+        return max(0, -(-(m * self.down - len(self.h) + 1) // self.up))
+
+    def _run(self, m_end):
+        if m_end <= self.m_next:
+            return self.buffer[:0]
+        s = self._first_input(self.m_next) // self.down * self.down
+        local = self.buffer[s - self.start:]
+        offset = s * self.up // self.down
+        y = signal.upfirdn(self.h, local, self.up, self.down, axis=0)
+        out = y[self.m_next - offset:m_end - offset]
+
+        # Se descartan las salidas iniciales que resample_poly recorta
+        drop = max(0, min(self.skip - self.m_next, len(out)))
+        self.m_next = m_end
+        keep = self._first_input(self.m_next) // self.down * self.down
+        self.buffer = self.buffer[keep - self.start:]
+        self.start = keep
+        return out[drop:]
+
+    @profiled('remuestreo')
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        if self.buffer is None:
+            self.buffer = block[:0]
+        self.buffer = np.concatenate([self.buffer, block])
+        self.n_in += len(block)
+        if not self.n_in:
+            return self.buffer
+        return self._run(((self.n_in - 1) * self.up) // self.down + 1)
+
+    def flush(self):
+        """
+        Devuelve las muestras pendientes al terminar la señal.
+        """
+        if self.buffer is None:
+            return np.empty(0)
+        n_out = -(-self.n_in * self.up // self.down)
+        m_end = self.skip + n_out
+        # Ceros después del final, como el relleno implícito de upfirdn
+        needed = (m_end - 1) * self.down // self.up + 1
+        pad = max(0, needed - (self.start + len(self.buffer)))
+        self.buffer = np.concatenate(
+            [self.buffer, np.zeros((pad,) + self.buffer.shape[1:])])
+        return self._run(m_end)
@@ -0,0 +1,333 @@
+# Reproducción en tiempo real a través de la cadena de filtros
+#
+# El motor entrega bloques pequeños a pedido del dispositivo de salida
+# (modo callback): lee el bloque de la fuente, lo filtra de forma causal
+# con el estado guardado del bloque anterior y lo devuelve. Los parámetros
+# del filtro pueden cambiarse durante la reproducción; el cambio se hace
+# con un fundido cruzado de un bloque para que no se oigan clics.
+#
+# Además de la tarjeta de sonido (PyAudioSink) hay salidas nula y a
+# archivo para usar el motor sin hardware de audio.
+#
+# Para monitorear en vivo (p. ej. con espectro.SlidingSpectrogram) hay dos
+# fuentes con read_available(): RealtimeSource repite un archivo al ritmo
+# del reloj y CaptureSource graba de la tarjeta de sonido.
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .bloques import StreamFilter
+from .filtros import design_filter
+from .wav import WavFile, WavWriter, pcm_to_float
+
+# Muestras por bloque: ~23 ms a 44.1 kHz
+PLAYBACK_BLOCK = 1024
+
+
+class BlockSource:
+    """
+    Fuente de audio que entrega bloques consecutivos (muestras, canales) en
+    flotante de 32 bits en [-1, 1).
+    """
+
+    def __init__(self, data, sample_rate):
+        data = np.asarray(data)
+        self.data = data[:, None] if data.ndim == 1 else data
+        self.sample_rate = sample_rate
+        self.channels = self.data.shape[1]
+        self.position = 0
+
+    @classmethod
+    def from_wav(cls, path):
+        wav_file = WavFile(path)
+        return cls(wav_file.read(), wav_file.sample_rate)
+
+    def read(self, frames):
+        block = self.data[self.position:self.position + frames]
+        self.position += len(block)
+        return pcm_to_float(block, np.float32)
+
+
+class RealtimeSource:
+    """
+    Entrega una BlockSource al ritmo del reloj, como si sonara: cada
+    read_available() devuelve las muestras transcurridas desde la llamada
+    anterior. Si el consumidor se atrasa más de max_lag segundos, lo
+    atrasado se descarta (se cuenta en dropped) para no acumular memoria.
+    """
+
+    def __init__(self, source, loop=False, max_lag=0.5):
+        self.source = source
+        self.loop = loop
+        self.max_lag = max_lag
+        self.sample_rate = source.sample_rate
+        self.channels = source.channels
+        self.dropped = 0
+        self.finished = False
+        self._start = None
+        self._delivered = 0
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._delivered = 0
+
+    def stop(self):
+        self._start = None
+
+    def read_available(self):
+        if self._start is None or self.finished:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        due = int((time.perf_counter() - self._start) * self.sample_rate) - self._delivered
+        limit = int(self.max_lag * self.sample_rate)
+        if due > limit:
+            self._skip(due - limit)
+            due = limit
+        self._delivered += due
+        return self._read(due)
+
+    def _skip(self, frames):
+        self.dropped += frames
+        self._delivered += frames
+        position = self.source.position + frames
+        total = len(self.source.data)
+        self.source.position = position % total if self.loop and total else min(position, total)
+
+    def _read(self, frames):
+        block = self.source.read(frames)
+        if len(block) == frames:
+            return block
+        if not self.loop or not len(self.source.data):
+            self.finished = True
+            return block
+        parts = [block]
+        got = len(block)
+        while got < frames:
+            self.source.position = 0
+            parts.append(self.source.read(frames - got))
+            got += len(parts[-1])
+        return np.concatenate(parts)
+
+
+class CaptureSource:
+    """
+    Captura de la tarjeta de sonido con PyAudio en modo callback. Los
+    bloques esperan en una cola de a lo más max_seconds; si nadie los lee
+    se descartan los más viejos (se cuentan en dropped).
+    """
+
+    def __init__(self, sample_rate=48000, channels=1, block_size=PLAYBACK_BLOCK,
+                 max_seconds=2.0, device=None):
+        import pyaudio  # Solo hace falta si se graba de la tarjeta
+        self._pyaudio = pyaudio
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.device = device
+        self.dropped = 0
+        self.finished = False
+        self._blocks = deque(maxlen=max(1, int(max_seconds * sample_rate / block_size)))
+        self._audio = pyaudio.PyAudio()
+        self._stream = None
+
+    def start(self):
+        pyaudio = self._pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            block = np.frombuffer(in_data, dtype=np.int16).reshape(-1, self.channels)
+            if len(self._blocks) == self._blocks.maxlen:
+                self.dropped += len(self._blocks[0])
+            self._blocks.append(pcm_to_float(block, np.float32))
+            return None, pyaudio.paContinue
+
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16, channels=self.channels, rate=int(self.sample_rate),
+            input=True, input_device_index=self.device, frames_per_buffer=self.block_size,
+            stream_callback=callback)
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        self._audio.terminate()
+
+    def read_available(self):
+        blocks = []
+        while self._blocks:
+            blocks.append(self._blocks.popleft())
+        if not blocks:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        return np.concatenate(blocks)
+
+
+class PlaybackEngine:
+    """
+    Filtra una fuente bloque a bloque para reproducirla en tiempo real.
+    """
+
+    def __init__(self, source, block_size=PLAYBACK_BLOCK):
+        self.source = source
+        self.block_size = block_size
+        self.filter = None  # Sin filtro: la señal pasa tal cual
+        self._pending = None
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.finished = False
+
+    @property
+    def sample_rate(self):
+        return self.source.sample_rate
+
+    @property
+    def channels(self):
+        return self.source.channels
+
+    def set_filter(self, btype=None, cutoff=None, order=5):
+        """
+        Cambia el filtro; btype=None deja pasar la señal sin filtrar. Se
+        puede llamar desde otro hilo mientras se reproduce.
+        """
+        new_filter = None
+        if btype is not None:
+            new_filter = StreamFilter(design_filter(btype, self.sample_rate, cutoff, order),
+                                      np.float32)
+        with self._lock:
+            self._pending = new_filter if new_filter is not None else _BYPASS
+
+    def render(self, frames=None):
+        """
+        Devuelve el siguiente bloque filtrado (muestras, canales) en float32.
+        Al acabarse la fuente el bloque se completa con ceros y finished
+        pasa a True.
+        """
+        frames = frames or self.block_size
+        block = self.source.read(frames)
+        with self._lock:
+            pending, self._pending = self._pending, None
+
+        if pending is not None and not self.rendered:
+            # Antes de empezar no hay nada que fundir
+            self.filter, pending = (None if pending is _BYPASS else pending), None
+        out = _apply(self.filter, block)
+        if pending is not None:
+            new_filter = None if pending is _BYPASS else pending
+            if len(block):
+                # Fundido cruzado entre el filtro anterior y el nuevo
+                ramp = np.linspace(0.0, 1.0, len(block), dtype=np.float32)[:, None]
+                out = out * (1 - ramp) + _apply(new_filter, block) * ramp
+            self.filter = new_filter
+        self.rendered += len(block)
+
+        if len(block) < frames:
+            self.finished = True
+            out = np.concatenate([out, np.zeros((frames - len(block), self.channels), np.float32)])
+        return out
+
+    def play(self, sink, realtime=False):
+        """
+        Reproduce hasta el final en una salida de escritura (NullSink,
+        WavSink). Con realtime=True se respeta la duración de cada bloque.
+        """
+        sink.open(self.sample_rate, self.channels)
+        period = self.block_size / self.sample_rate
+        start = time.perf_counter()
+        blocks = 0
+        try:
+            while not self.finished:
+                sink.write(self.render())
+                blocks += 1
+                if realtime:
+                    delay = start + blocks * period - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            sink.close()
+
+
+_BYPASS = object()
+
+
+def _apply(stream_filter, block):
+    if stream_filter is None or not len(block):
+        return block
+    return stream_filter.process(block)
+
+
+class NullSink:
+    """
+    Salida que descarta el audio; solo cuenta las muestras recibidas.
+    """
+
+    def __init__(self):
+        self.frames = 0
+
+    def open(self, sample_rate, channels):
+        self.frames = 0
+
+    def write(self, block):
+        self.frames += len(block)
+
+    def close(self):
+        pass
+
+
+class WavSink:
+    """
+    Salida a un archivo WAV en flotante de 32 bits.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+
+    def open(self, sample_rate, channels):
+        self._writer = WavWriter(self.path, sample_rate, channels, np.float32)
+
+    def write(self, block):
+        self._writer.write(block)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class PyAudioSink:
+    """
+    Salida a la tarjeta de sonido con PyAudio en modo callback: el
+    dispositivo pide cada bloque al motor cuando lo necesita y start()
+    regresa de inmediato.
+    """
+
+    def __init__(self):
+        import pyaudio  # Solo hace falta si se reproduce por la tarjeta
+        self._pyaudio = pyaudio
+        self._audio = pyaudio.PyAudio()
+        self._stream = None
+
+    def start(self, engine):
+        pyaudio = self._pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            block = engine.render(frame_count)
+            pcm = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+            flag = pyaudio.paComplete if engine.finished else pyaudio.paContinue
+            return pcm.tobytes(), flag
+
+        self._stream = self._audio.open(
+            format=pyaudio.paInt16, channels=engine.channels, rate=int(engine.sample_rate),
+            output=True, frames_per_buffer=engine.block_size, stream_callback=callback)
+        self._stream.start_stream()
+
+    def is_active(self):
+        return self._stream is not None and self._stream.is_active()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        self._audio.terminate()
@@ -0,0 +1,464 @@
+# Servidor de trabajos de procesamiento por HTTP local
+#
+# Uso:
+#   python -m dsp.servidor -j 4 --cola 32
+#   python -m dsp.cliente salud
+#   python -m dsp.cliente filtrar entrada.wav salida.wav -c "high:300,low:8000"
+#   python -m dsp.servidor --raiz /datos/audio   # permite el modo de rutas
+#
+# Un proceso de larga duración recibe trabajos de filtrado y FFT y los
+# reparte entre un grupo de procesos que se crea al arrancar. Cada proceso
+# importa scipy y diseña los filtros habituales una sola vez, así un
+# trabajo no paga el arranque del intérprete ni las importaciones.
+#
+# Rutas:
+#   GET  /salud      estado, procesos y trabajos en curso
+#   GET  /metricas   contadores, rendimiento y latencias
+#   POST /filtrar    cuerpo WAV -> WAV filtrado (parámetros cadena, causal,
+#                    precision en la URL); o cuerpo JSON con rutas locales
+#                    {"entrada", "salida", "cadena", ...} -> entrada del resumen
+#   POST /fft        cuerpo WAV -> JSON con frecuencias y magnitud (puntos)
+#
+# El modo de rutas solo está disponible si el servidor se arranca con
+# --raiz, y solo con archivos dentro de ese directorio. La cadena siempre
+# va como texto: el servidor no lee cadenas guardadas en archivos .json.
+#
+# Control de carga: como mucho --procesos trabajos se ejecutan a la vez y
+# --cola esperan; los demás se rechazan con 503 sin guardar ni procesar el
+# cuerpo. Las respuestas se envían por bloques esperando a que el cliente
+# lea, así un cliente lento no llena la memoria del servidor.
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .bloques import BLOCK_SIZE
+from .cadena import Pipeline
+from .cliente import DEFAULT_HOST, DEFAULT_PORT
+from .lotes import process_file
+
+# Trabajos que pueden esperar turno además de los que se ejecutan
+DEFAULT_QUEUE = 32
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_BODY = 2 ** 31
+
+# Cuerpo máximo que se descarta para poder responder 503 a un cliente
+# que todavía está enviando
+DISCARD_LIMIT = 64 * 2 ** 20
+
+# Bytes por lectura o escritura en el socket
+CHUNK_SIZE = 1 << 20
+
+# Muestras de magnitud que devuelve /fft por defecto
+FFT_POINTS = 4096
+
+# Errores de un trabajo que se deben a lo que envió el cliente (un WAV
+# inválido, un corte fuera de rango...): se responden con 400, no con 500
+INPUT_ERRORS = ("ValueError", "EOFError")
+
+# Filtros que se diseñan al arrancar cada proceso: los de analisis_seniales
+WARM_FILTERS = [
+    ('low', 1000, 5), ('high', 10000, 10), ('band', (1000, 10000), 5),
+]
+WARM_RATES = (44100, 48000)
+
+_STATUS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _warm_worker():
+    # Se ejecuta una vez en cada proceso del grupo
+    from . import espectro, filtros
+    for rate in WARM_RATES:
+        for btype, cutoff, order in WARM_FILTERS:
+            filtros.design_filter(btype, rate, cutoff, order)
+    espectro.compute_fft(np.zeros(1024), WARM_RATES[0])
+
+
+def fft_job(path, points=FFT_POINTS):
+    """
+    FFT de un archivo WAV reducida a unos points valores por canal (el
+    máximo de cada tramo, para no perder picos). Se ejecuta en el grupo.
+    """
+    from .espectro import compute_fft
+    from .wav import load_wav, pcm_to_float
+    data, sample_rate = load_wav(path)
+    freq, magnitude = compute_fft(pcm_to_float(data, np.float32), sample_rate)
+    if len(freq) > points:
+        starts = np.linspace(0, len(freq), points, endpoint=False).astype(np.intp)
+        freq = freq[starts]
+        magnitude = np.maximum.reduceat(magnitude, starts, axis=0)
+    return {"frecuencia": sample_rate, "frecuencias": freq.tolist(),
+            "magnitud": magnitude.T.tolist()}
+
+
+class JobServer:
+    """
+    Servidor asyncio con un grupo de procesos siempre cargado. jobs es el
+    número de procesos (y de trabajos simultáneos) y queue el de trabajos
+    que pueden esperar turno. root es el directorio de los archivos que se
+    pueden filtrar por ruta; sin root el modo de rutas está desactivado.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None, queue=DEFAULT_QUEUE,
+                 spool=None, block_size=BLOCK_SIZE, root=None):
+        self.host = host
+        self.port = port
+        self.jobs = jobs or os.cpu_count() or 1
+        self.queue = queue
+        self.block_size = block_size
+        self.spool = spool
+        self.root = os.path.realpath(root) if root is not None else None
+        self.pool = None
+        self.server = None
+        self._slots = None
+        self.admitted = 0  # Trabajos aceptados que aún no terminan de responder
+        self.running = 0
+        self.start = time.time()
+        self.stats = {"recibidos": 0, "completados": 0, "errores": 0, "rechazados": 0,
+                      "bytes_entrada": 0, "bytes_salida": 0, "muestras": 0,
+                      "segundos_proceso": 0.0, "latencia_total": 0.0, "latencia_maxima": 0.0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """
+        Arranca el grupo de procesos, espera a que todos estén cargados y
+        empieza a escuchar.
+        """
+        if self.spool is None:
+            self.spool = tempfile.mkdtemp(prefix="dsp_servidor_")
+            self._own_spool = True
+        else:
+            os.makedirs(self.spool, exist_ok=True)
+            self._own_spool = False
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_warm_worker)
+        loop = asyncio.get_running_loop()
+        # Una tarea vacía por proceso obliga a crearlos (y calentarlos) ya
+        await asyncio.gather(*(loop.run_in_executor(self.pool, int) for _ in range(self.jobs)))
+        self._slots = asyncio.Semaphore(self.jobs)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                 limit=CHUNK_SIZE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.start = time.time()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        if getattr(self, '_own_spool', False):
+            shutil.rmtree(self.spool, ignore_errors=True)
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    @property
+    def waiting(self):
+        return self.admitted - self.running
+
+    def health(self):
+        return {"estado": "ok", "procesos": self.jobs, "activos": self.running,
+                "en_cola": self.waiting, "cola_maxima": self.queue,
+                "segundos_activo": time.time() - self.start}
+
+    def metrics(self):
+        """
+        Contadores acumulados y valores derivados: trabajos por segundo,
+        latencia media (de la llegada a la respuesta) y muestras
+        procesadas por segundo de proceso.
+        """
+        stats = dict(self.stats)
+        uptime = time.time() - self.start
+        done = stats["completados"]
+        stats.update(
+            activos=self.running, en_cola=self.waiting, segundos_activo=uptime,
+            trabajos_por_segundo=done / uptime if uptime else 0.0,
+            latencia_media=stats["latencia_total"] / done if done else 0.0,
+            muestras_por_segundo=(stats["muestras"] / stats["segundos_proceso"]
+                                  if stats["segundos_proceso"] else 0.0))
+        return stats
+
+    async def _handle(self, reader, writer):
+        try:
+            method, target, headers = await self._read_head(reader)
+            url = urlsplit(target)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/salud":
+                await self._send_json(writer, 200, self.health())
+            elif url.path == "/metricas":
+                await self._send_json(writer, 200, self.metrics())
+            elif url.path in ("/filtrar", "/fft"):
+                if method != "POST":
+                    raise HTTPError(405, "Use POST")
+                await self._job(url.path[1:], reader, writer, headers, params)
+            else:
+                raise HTTPError(404, f"Ruta desconocida: {url.path}")
+        except HTTPError as exc:
+            await self._send_json(writer, exc.status, {"error": str(exc)})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_head(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(400, "Cabecera demasiado larga")
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Petición mal formada")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _send_json(self, writer, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        await self._send_head(writer, status, "application/json; charset=utf-8", len(body))
+        writer.write(body)
+        await writer.drain()
+        self.stats["bytes_salida"] += len(body)
+
+    async def _send_head(self, writer, status, content_type, length):
+        writer.write((f"HTTP/1.1 {status} {_STATUS.get(status, '')}\r\n"
+                      f"Content-Type: {content_type}\r\nContent-Length: {length}\r\n"
+                      f"Connection: close\r\n\r\n").encode('latin-1'))
+
+    async def _send_file(self, writer, path):
+        size = os.path.getsize(path)
+        await self._send_head(writer, 200, "audio/wav", size)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()  # No se lee más hasta que el cliente recibe
+        self.stats["bytes_salida"] += size
+
+    async def _receive_file(self, reader, length, path):
+        remaining = length
+        with open(path, 'wb') as f:
+            while remaining:
+                chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                f.write(chunk)
+                remaining -= len(chunk)
+        self.stats["bytes_entrada"] += length
+
+    async def _job(self, kind, reader, writer, headers, params):
+        self.stats["recibidos"] += 1
+        if self.admitted >= self.jobs + self.queue:
+            self.stats["rechazados"] += 1
+            await self._discard(reader, headers)
+            raise HTTPError(503, "Servidor ocupado, intente más tarde")
+        if "content-length" not in headers:
+            raise HTTPError(411, "Falta Content-Length")
+        length = _content_length(headers)
+        if length is None:
+            raise HTTPError(400, f"Content-Length inválido: {headers['content-length']}")
+        if length > MAX_BODY:
+            raise HTTPError(413, "Cuerpo demasiado grande")
+
+        arrival = time.perf_counter()
+        self.admitted += 1
+        directory = tempfile.mkdtemp(dir=self.spool)
+        try:
+            if headers.get("content-type", "").startswith("application/json"):
+                request = json.loads((await reader.readexactly(length)).decode('utf-8'))
+                self.stats["bytes_entrada"] += length
+                if kind != "filtrar":
+                    raise HTTPError(400, "/fft solo recibe un WAV")
+                if self.root is None:
+                    raise HTTPError(403, "Modo de rutas desactivado "
+                                         "(arranque el servidor con --raiz)")
+                src = self._local_path(request["entrada"])
+                dst = self._local_path(request["salida"])
+                if src == dst:
+                    raise HTTPError(400, "La salida sobrescribiría la entrada")
+                entry = await self._run_filter(src, dst, request.get("cadena", ""), request)
+                await self._send_json(writer, 200, entry)
+            else:
+                src = os.path.join(directory, "entrada.wav")
+                await self._receive_file(reader, length, src)
+                if kind == "filtrar":
+                    dst = os.path.join(directory, "salida.wav")
+                    await self._run_filter(src, dst, params.get("cadena", ""), params)
+                    await self._send_file(writer, dst)
+                else:
+                    points = int(params.get("puntos", FFT_POINTS))
+                    result = await self._run(fft_job, src, points)
+                    await self._send_json(writer, 200, result)
+            latency = time.perf_counter() - arrival
+            self.stats["completados"] += 1
+            self.stats["latencia_total"] += latency
+            self.stats["latencia_maxima"] = max(self.stats["latencia_maxima"], latency)
+        except HTTPError:
+            self.stats["errores"] += 1
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # El cliente cortó la conexión: no hay a quién responder
+            raise
+        except (KeyError, ValueError, EOFError) as exc:
+            self.stats["errores"] += 1
+            raise HTTPError(400, self._public_error(f"{type(exc).__name__}: {exc}"))
+        except Exception as exc:
+            self.stats["errores"] += 1
+            raise HTTPError(500, self._public_error(f"{type(exc).__name__}: {exc}"))
+        finally:
+            self.admitted -= 1
+            shutil.rmtree(directory, ignore_errors=True)
+
+    async def _discard(self, reader, headers):
+        # Un cliente que aún está enviando no leería el 503: si el cuerpo es
+        # pequeño se descarta sin guardarlo; si no, se corta la conexión
+        length = _content_length(headers)
+        if length is None or length > DISCARD_LIMIT:
+            return
+        while length:
+            chunk = await reader.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    async def _run(self, func, *args):
+        # Espera un proceso libre; el cuerpo ya se recibió, así la cola
+        # solo ocupa disco en el directorio temporal
+        async with self._slots:
+            self.running += 1
+            start = time.perf_counter()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+            finally:
+                self.running -= 1
+                self.stats["segundos_proceso"] += time.perf_counter() - start
+
+    def _public_error(self, message):
+        # Las rutas del directorio temporal no dicen nada al cliente y
+        # muestran el del servidor: se dejan solo los nombres
+        return re.sub(re.escape(self.spool) + r"[^\s:]*",
+                      lambda match: os.path.basename(match.group()), message)
+
+    def _local_path(self, path):
+        # Las rutas relativas son relativas a la raíz; los enlaces se
+        # resuelven antes de comprobar que no se sale de ella
+        if not isinstance(path, str) or not path:
+            raise HTTPError(400, "Ruta vacía o inválida")
+        full = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise HTTPError(403, f"Ruta fuera de la raíz del servidor: {path}")
+        return full
+
+    async def _run_filter(self, src, dst, chain, options):
+        # La cadena se valida aquí para responder 400 sin ocupar un proceso;
+        # solo se acepta como texto, así una petición no abre archivos
+        if not isinstance(chain, str) or chain.endswith('.json'):
+            raise HTTPError(400, "La cadena debe ir como texto, p. ej. \"high:300,low:8000\"")
+        spec = Pipeline.from_spec(chain).to_json()
+        zero_phase = not _flag(options.get("causal", False))
+        precision = options.get("precision", "float64")
+        if precision not in ("float64", "float32"):
+            raise HTTPError(400, f"Precisión desconocida: {precision}")
+        entry = await self._run(process_file, src, dst, spec, self.block_size, zero_phase,
+                                precision)
+        if entry["estado"] != "ok":
+            error = entry["error"]
+            status = 400 if error.split(":", 1)[0] in INPUT_ERRORS else 500
+            raise HTTPError(status, self._public_error(error))
+        self.stats["muestras"] += entry["muestras"]
+        return entry
+
+
+def _content_length(headers):
+    # Longitud del cuerpo, 0 si no se indica y None si no es un entero >= 0
+    value = headers.get("content-length", "0")
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ("1", "si", "sí", "true")
+    return bool(value)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None, queue=DEFAULT_QUEUE,
+                spool=None, root=None, log=print):
+    """
+    Arranca el servidor y atiende peticiones hasta que se interrumpe.
+    """
+    async with JobServer(host, port, jobs, queue, spool, root=root) as server:
+        log(f"Escuchando en http://{server.host}:{server.port} "
+            f"({server.jobs} procesos, cola de {server.queue})")
+        if server.root is not None:
+            log(f"Modo de rutas activo en {server.root}")
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m dsp.servidor",
+        description="Servidor HTTP local de trabajos de filtrado y FFT.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="dirección donde escuchar")
+    parser.add_argument("-p", "--puerto", type=int, default=DEFAULT_PORT, help="puerto")
+    parser.add_argument("-j", "--procesos", type=int, default=None,
+                        help="procesos y trabajos simultáneos (por defecto, uno por núcleo)")
+    parser.add_argument("--cola", type=int, default=DEFAULT_QUEUE,
+                        help="trabajos que pueden esperar turno antes de rechazar")
+    parser.add_argument("--temporal", help="directorio para los archivos en tránsito")
+    parser.add_argument("--raiz",
+                        help="permitir filtrar por ruta los archivos de este directorio "
+                             "(por defecto, desactivado)")
+    args = parser.parse_args(argv)
+    if args.raiz is not None and not os.path.isdir(args.raiz):
+        parser.error(f"no existe el directorio {args.raiz}")
+    try:
+        asyncio.run(serve(args.host, args.puerto, args.procesos, args.cola, args.temporal,
+                          args.raiz))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# Lectura y escritura de archivos WAV
+#
+# El lector interpreta la cabecera RIFF y proyecta los datos en memoria
+# (np.memmap) como un arreglo (muestras, canales) del tipo correcto, sin
+# copiarlos: solo se leen del disco las páginas que realmente se usan.
+
+import struct
+
+import numpy as np
+
+from .perfil import profiled
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Tipo de dato de numpy según el formato y el ancho de muestra en bytes.
+# Las muestras de 24 bits no tienen tipo nativo: se proyectan como bytes y
+# se convierten a int32 (alineadas a la izquierda) solo en el tramo leído.
+_DTYPES = {
+    (_WAVE_FORMAT_PCM, 1): np.dtype(np.uint8),
+    (_WAVE_FORMAT_PCM, 2): np.dtype('<i2'),
+    (_WAVE_FORMAT_PCM, 3): np.dtype(np.uint8),
+    (_WAVE_FORMAT_PCM, 4): np.dtype('<i4'),
+    (_WAVE_FORMAT_IEEE_FLOAT, 4): np.dtype('<f4'),
+    (_WAVE_FORMAT_IEEE_FLOAT, 8): np.dtype('<f8'),
+}
+
+
+class WavFile:
+    """
+    Archivo WAV abierto para lectura por proyección en memoria.
+
+    data es un np.memmap de solo lectura con forma (muestras, canales); read()
+    devuelve el tramo indicado en segundos sin copiar los datos (salvo en
+    archivos de 24 bits, donde se convierte únicamente ese tramo).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:] != b'WAVE':
+                raise ValueError(f"{path} no es un archivo WAV")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} no tiene bloque de datos")
+                chunk_id, size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(size)
+                    f.seek(size % 2, 1)
+                elif chunk_id == b'data':
+                    offset = f.tell()
+                    break
+                else:
+                    f.seek(size + size % 2, 1)
+            f.seek(0, 2)
+            file_size = f.tell()
+        if fmt is None:
+            raise ValueError(f"{path} no tiene bloque de formato")
+
+        tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+            tag = struct.unpack('<H', fmt[24:26])[0]
+        sampwidth = (bits + 7) // 8
+        if (tag, sampwidth) not in _DTYPES:
+            raise ValueError(f"Formato WAV no soportado: {tag} con {bits} bits")
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.format_tag = tag
+        # Algunos programas dejan el tamaño del bloque en 0 o 0xFFFFFFFF
+        # cuando graban en vivo; se limita a lo que hay en el archivo.
+        size = min(size, file_size - offset) if size else file_size - offset
+        self.frames = size // block_align
+
+        dtype = _DTYPES[(tag, sampwidth)]
+        shape = (self.frames, channels, 3) if sampwidth == 3 else (self.frames, channels)
+        if self.frames:
+            self.data = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        else:
+            self.data = np.empty(shape, dtype=dtype)
+
+    @property
+    def dtype(self):
+        """
+        Tipo de las muestras devueltas por read().
+        """
+        return np.dtype('<i4') if self.sampwidth == 3 else self.data.dtype
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def read(self, start=None, end=None):
+        """
+        Devuelve las muestras entre start y end (segundos) como arreglo
+        (muestras, canales).
+        """
+        i0 = 0 if start is None else max(0, int(round(start * self.sample_rate)))
+        i1 = self.frames if end is None else min(self.frames, int(round(end * self.sample_rate)))
+        return self.read_frames(i0, i1)
+
+    def read_frames(self, first, last):
+        """
+        Igual que read() pero con índices de muestra.
+        """
+        view = self.data[first:last]
+        if self.sampwidth == 3:
+            return _int24_to_int32(view)
+        return view
+
+
+def _int24_to_int32(raw):
+    # Los tres bytes se colocan en la parte alta de un int32, así la escala
+    # completa coincide con la de los archivos de 32 bits.
+    out = np.zeros(raw.shape[:-1] + (4,), dtype=np.uint8)
+    out[..., 1:] = raw
+    return out.view('<i4')[..., 0]
+
+
+@profiled('cargar')
+def load_wav(path, start=None, end=None):
+    """
+    Carga un archivo WAV y devuelve (datos, frecuencia de muestreo).
+
+    Los datos son una proyección en memoria con forma (muestras, canales);
+    start y end (segundos) permiten leer solo un tramo.
+    """
+    wav_file = WavFile(path)
+    return wav_file.read(start, end), wav_file.sample_rate
+
+
+@profiled('convertir')
+def pcm_to_float(data, dtype=np.float64, out=None):
+    """
+    Convierte muestras PCM enteras a flotantes en el intervalo [-1, 1).
+
+    dtype es la precisión del resultado (np.float32 usa la mitad de
+    memoria). Si se da out, el resultado se escribe en ese arreglo.
+    """
+    data = np.asarray(data)
+    if data.dtype.kind == 'f' and out is None:
+        return data.astype(dtype, copy=False)
+    if out is None:
+        out = np.empty(data.shape, dtype=dtype)
+    np.copyto(out, data, casting='unsafe')
+    if data.dtype == np.uint8:
+        out -= 128
+        out /= 128
+    elif data.dtype.kind != 'f':
+        out /= -float(np.iinfo(data.dtype).min)
+    return out
+
+
+@profiled('convertir')
+def float_to_pcm(data, dtype=np.int16, normalized=False, out=None, overwrite=False):
+    """
+    Convierte una señal flotante a PCM entero redondeando y saturando en
+    los límites del tipo, sin desbordes.
+
+    Con normalized=True la señal está en [-1, 1) y se escala al intervalo
+    del tipo; si no, ya está en la escala de las muestras PCM (la salida de
+    filtrar la señal cargada con load_wav). Con overwrite=True el escalado,
+    el redondeo y la saturación se hacen sobre data misma, sin copias
+    intermedias. Si se da out, el resultado se escribe en ese arreglo.
+    """
+    dtype = np.dtype(dtype)
+    data = np.asarray(data)
+    if data.dtype.kind != 'f':
+        data = data.astype(np.float64)
+    elif not overwrite:
+        data = data.copy()
+    info = np.iinfo(dtype)
+    if normalized:
+        data *= 128 if dtype == np.uint8 else -float(info.min)
+    if dtype == np.uint8:
+        data += 128
+    np.rint(data, out=data)
+    # El máximo de int32 no es representable en float32: se toma el
+    # flotante inmediatamente inferior para que la conversión no desborde
+    high = data.dtype.type(info.max)
+    if int(high) > info.max:
+        high = np.nextafter(high, data.dtype.type(0))
+    np.clip(data, info.min, high, out=data)
+    if out is None:
+        return data.astype(dtype)
+    np.copyto(out, data, casting='unsafe')
+    return out
+
+
+class WavWriter:
+    """
+    Escribe un archivo WAV por bloques. La cabecera se completa al cerrar,
+    así no hace falta conocer la duración de antemano.
+    """
+
+    def __init__(self, path, sample_rate, channels, dtype=np.int16, sampwidth=None):
+        self.dtype = np.dtype(dtype)
+        self.sampwidth = sampwidth or self.dtype.itemsize
+        self.channels = channels
+        self.frames = 0
+        tag = _WAVE_FORMAT_IEEE_FLOAT if self.dtype.kind == 'f' else _WAVE_FORMAT_PCM
+        block_align = channels * self.sampwidth
+        self._file = open(path, 'wb')
+        self._file.write(struct.pack(
+            '<4sI4s4sIHHIIHH4sI', b'RIFF', 0, b'WAVE', b'fmt ', 16, tag, channels,
+            int(sample_rate), int(sample_rate) * block_align, block_align,
+            8 * self.sampwidth, b'data', 0))
+
+    @profiled('guardar')
+    def write(self, data):
+        data = np.asarray(data, dtype=self.dtype.newbyteorder('<'))
+        if self.sampwidth == 3:
+            raw = data.reshape(-1, 1).view(np.uint8)[:, 1:]
+        else:
+            raw = data
+        self._file.write(np.ascontiguousarray(raw).tobytes())
+        self.frames += data.size // self.channels
+
+    def close(self):
+        if self._file.closed:
+            return
+        size = self.frames * self.channels * self.sampwidth
+        if size % 2:
+            self._file.write(b'\0')
+        self._file.seek(4)
+        self._file.write(struct.pack('<I', 36 + size + size % 2))
+        self._file.seek(40)
+        self._file.write(struct.pack('<I', size))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def save_wav(path, sample_rate, data):
+    """
+    Guarda una señal como WAV PCM de 16 bits. Los datos pueden ser una
+    señal mono o un arreglo (muestras, canales) en la escala de int16: los
+    flotantes se redondean y saturan con float_to_pcm sin normalizar. Para
+    otros formatos de muestra hay que usar WavWriter.
+    """
+    data = np.asarray(data)
+    channels = data.shape[1] if data.ndim > 1 else 1
+    if data.dtype != np.int16:
+        data = float_to_pcm(data, np.int16)
+    with WavWriter(path, sample_rate, channels) as wav_file:
+        wav_file.write(data)
@@ -0,0 +1,130 @@
+# Gráficas de señales largas para las HMI con matplotlib
+# Daniel Nava Mondragón A0166161649
+#
+# WaveformLine dibuja solo la envolvente mín/máx necesaria para el ancho
+# en píxeles del eje y la recalcula al hacer zoom o desplazarse, de modo
+# que redibujar no depende de la duración del archivo.
+#
+# LiveSpectrogram muestra un espectro.SlidingSpectrogram en vivo: en cada
+# cuadro solo se actualiza la imagen y se copia (blit) sobre el fondo ya
+# dibujado, sin volver a dibujar ejes ni etiquetas con canvas.draw.
+
+import numpy as np
+
+from dsp.envolvente import MinMaxPyramid
+
+
+class WaveformLine:
+    """
+    Curva de una señal muestreada uniformemente sobre un eje de matplotlib.
+
+    rate es el número de muestras por unidad del eje x (la frecuencia de
+    muestreo para un eje de tiempo, 1 / df para un espectro). data puede ser
+    la señal o una MinMaxPyramid ya calculada, por ejemplo en otro hilo.
+    """
+
+    def __init__(self, ax, data, rate, x0=0.0, **kwargs):
+        self.ax = ax
+        self.rate = rate
+        self.x0 = x0
+        self.pyramid = data if isinstance(data, MinMaxPyramid) else MinMaxPyramid(data)
+        positions, values = self._points(0, self.pyramid.frames)
+        self.lines = ax.plot(positions, values, **kwargs)
+
+        low, high = (float(v) for v in self.pyramid.limits)
+        margin = 0.05 * (high - low) or 1.0
+        ax.set_xlim(x0, x0 + self.pyramid.frames / rate)
+        ax.set_ylim(low - margin, high + margin)
+        ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    def _points(self, first, last):
+        width = self.ax.bbox.width or 1000
+        positions, values = self.pyramid.envelope(first, last, width)
+        return self.x0 + positions / self.rate, values
+
+    def _on_xlim_changed(self, ax):
+        x_min, x_max = ax.get_xlim()
+        first = (x_min - self.x0) * self.rate
+        last = (x_max - self.x0) * self.rate + 1
+        positions, values = self._points(np.floor(first), last)
+        if values.ndim == 1:
+            values = values[:, None]
+        for i, line in enumerate(self.lines):
+            line.set_data(positions, values[:, i])
+
+
+def plot_spectrum(ax, freq, magnitude, **kwargs):
+    """
+    Dibuja un espectro con WaveformLine a partir de su rejilla uniforme de
+    frecuencias.
+    """
+    df = freq[1] - freq[0] if len(freq) > 1 else 1.0
+    return WaveformLine(ax, magnitude, 1 / df, x0=freq[0] if len(freq) else 0.0, **kwargs)
+
+
+class LiveSpectrogram:
+    """
+    Imagen de un SlidingSpectrogram que se actualiza con update(). El fondo
+    del eje se guarda en cada dibujo completo (al crear la figura o cambiar
+    su tamaño) y los cuadros siguientes solo redibujan la imagen.
+
+    Para abaratar cada cuadro las frecuencias se reducen a max_rows filas
+    (el máximo de cada grupo, para no perder picos) y los colores se toman
+    de una tabla, así matplotlib recibe una imagen RGBA ya coloreada.
+    mappable sirve para la barra de colores.
+    """
+
+    def __init__(self, ax, spectrogram, vmin=-100.0, vmax=0.0, cmap='magma', max_rows=256):
+        from matplotlib import colormaps
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.colors import Normalize
+
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.spectrogram = spectrogram
+        self.vmin = vmin
+        self._scale = 255 / (vmax - vmin)
+        self._lut = (colormaps[cmap](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+        self.mappable = ScalarMappable(Normalize(vmin, vmax), cmap)
+
+        # Búferes de cada cuadro, reservados una sola vez
+        self._full = spectrogram.image()
+        rows = min(max_rows, len(self._full))
+        self._starts = np.linspace(0, len(self._full), rows, endpoint=False).astype(np.intp)
+        self._frame = np.maximum.reduceat(self._full, self._starts, axis=0)
+        self._index = np.zeros(self._frame.shape, dtype=np.uint8)
+        self._rgba = self._lut[self._index]
+
+        self.image = ax.imshow(self._colorize(), origin='lower', aspect='auto',
+                               interpolation='nearest', animated=True,
+                               extent=(-spectrogram.seconds, 0, 0, spectrogram.sample_rate / 2))
+        ax.set_xlabel("Tiempo [s]")
+        ax.set_ylabel("Frecuencia [Hz]")
+        self.background = None
+        self._cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _colorize(self):
+        self.spectrogram.image(out=self._full)
+        frame = np.maximum.reduceat(self._full, self._starts, axis=0, out=self._frame)
+        frame -= self.vmin
+        frame *= self._scale
+        np.clip(frame, 0, 255, out=frame)
+        self._index[...] = frame
+        return np.take(self._lut, self._index, axis=0, out=self._rgba)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.image)
+
+    def update(self):
+        self.image.set_data(self._colorize())
+        if self.background is None:
+            self.canvas.draw_idle()  # Aún no hay fondo: primer dibujo completo
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.image)
+        self.canvas.blit(self.ax.bbox)
+
+    def remove(self):
+        self.canvas.mpl_disconnect(self._cid)
+        self.image.remove()
@@ -1,16 +1,31 @@
-import wave
+# Al arrancar solo se importan tkinter y numpy para que la ventana aparezca
+# de inmediato: scipy se precarga en segundo plano y matplotlib y PyAudio
+# se importan la primera vez que se grafica o se reproduce.
+
+import importlib
+import threading
+
 import numpy as np
-import matplotlib.pyplot as plt
-import scipy.signal as signal
 import tkinter as tk
 from tkinter import filedialog, ttk
-import soundfile as sf
-import pyaudio
+
+from dsp.wav import load_wav, save_wav, pcm_to_float, float_to_pcm
 
 # Variables globales
 audio_file = None
 processed_signal = None
 sample_rate = None
+player = None  # Reproducción en curso: (motor, salida, es_original)
+
+# Tipo de filtro de scipy para cada opción del menú
+FILTER_TYPES = {"Pasa-baja": 'low', "Pasa-alta": 'high', "Pasa-banda": 'band'}
+
+# Módulos que dependen de scipy; se precargan en segundo plano
+HEAVY_MODULES = ('dsp.filtros', 'dsp.espectro', 'dsp.reproduccion')
+
+def preload_heavy_modules():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
 
 # Funciones para procesamiento de señal
 def load_audio():
@@ -19,45 +34,42 @@ def load_audio():
     if not filepath:
         return
     audio_file = filepath
-    data, sample_rate = sf.read(audio_file)
-    if len(data.shape) > 1:  # Convertir a mono si es estéreo
-        data = data.mean(axis=1)
+    data, sample_rate = load_wav(audio_file)
+    data = pcm_to_float(data)
     plot_signal(data, "Señal Original")
 
 def apply_filter():
     global processed_signal
     if audio_file is None:
         return
+    from dsp import lowpass_filter, highpass_filter, bandpass_filter
     
     cutoff = float(cutoff_slider.get())
     order = int(order_slider.get())
     filter_type = filter_var.get()
     
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff / nyquist
-    
+    raw_data = pcm_to_float(load_wav(audio_file)[0])
     if filter_type == "Pasa-baja":
-        b, a = signal.butter(order, normal_cutoff, btype='low')
+        processed_signal = lowpass_filter(raw_data, sample_rate, cutoff, order)
     elif filter_type == "Pasa-alta":
-        b, a = signal.butter(order, normal_cutoff, btype='high')
+        processed_signal = highpass_filter(raw_data, sample_rate, cutoff, order)
     elif filter_type == "Pasa-banda":
-        high_cutoff = float(high_cutoff_slider.get()) / nyquist
-        b, a = signal.butter(order, [normal_cutoff, high_cutoff], btype='band')
+        high_cutoff = float(high_cutoff_slider.get())
+        processed_signal = bandpass_filter(raw_data, sample_rate, cutoff, high_cutoff, order)
     else:
         return
     
-    raw_data, _ = sf.read(audio_file)
-    processed_signal = signal.filtfilt(b, a, raw_data)
     plot_signal(processed_signal, "Señal Filtrada")
 
 def apply_fft():
     if audio_file is None:
         return
-    data, _ = sf.read(audio_file)
-    freq = np.fft.fftfreq(len(data), d=1/sample_rate)
-    fft_signal = np.abs(np.fft.fft(data))
+    from dsp import compute_fft
+    import matplotlib.pyplot as plt
+    data = pcm_to_float(load_wav(audio_file)[0])
+    freq, fft_signal = compute_fft(data, sample_rate)
     plt.figure()
-    plt.plot(freq[:len(freq)//2], fft_signal[:len(freq)//2])
+    plt.plot(freq, fft_signal)
     plt.title("Transformada de Fourier")
     plt.xlabel("Frecuencia (Hz)")
     plt.ylabel("Magnitud")
@@ -68,61 +80,90 @@ def save_audio():
         return
     save_path = filedialog.asksaveasfilename(defaultextension=".wav", filetypes=[("WAV files", "*.wav")])
     if save_path:
-        sf.write(save_path, processed_signal, sample_rate)
+        # La señal está en [-1, 1]: se escala y satura a PCM de 16 bits
+        save_wav(save_path, sample_rate, float_to_pcm(processed_signal, normalized=True))
+
+def current_filter():
+    btype = FILTER_TYPES[filter_var.get()]
+    cutoff = float(cutoff_slider.get())
+    if btype == 'band':
+        cutoff = (cutoff, float(high_cutoff_slider.get()))
+    return btype, cutoff, int(order_slider.get())
 
 def play_audio(original=True):
+    # El audio se filtra por bloques mientras suena; la ventana no se
+    # bloquea y los controles cambian el filtro durante la reproducción.
+    global player
     if audio_file is None:
         return
-    
-    data, _ = sf.read(audio_file) if original else (processed_signal, sample_rate)
-    
-    if data is None:
-        return
-    
-    audio = (data * 32767).astype(np.int16).tobytes()
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paInt16, channels=1, rate=sample_rate, output=True)
-    stream.write(audio)
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    from dsp.reproduccion import BlockSource, PlaybackEngine, PyAudioSink
+    stop_audio()
+    engine = PlaybackEngine(BlockSource.from_wav(audio_file))
+    if not original:
+        engine.set_filter(*current_filter())
+    sink = PyAudioSink()
+    sink.start(engine)
+    player = (engine, sink, original)
+
+def stop_audio():
+    global player
+    if player is not None:
+        player[1].stop()
+        player = None
+
+def update_playback(*_):
+    if player is not None and not player[2]:
+        player[0].set_filter(*current_filter())
 
 def plot_signal(data, title):
+    import matplotlib.pyplot as plt
     plt.figure()
     plt.plot(np.linspace(0, len(data) / sample_rate, num=len(data)), data)
+    if data.ndim > 1 and data.shape[1] > 1:  # Una curva por canal
+        plt.legend([f"Canal {i + 1}" for i in range(data.shape[1])])
     plt.title(title)
     plt.xlabel("Tiempo (s)")
     plt.ylabel("Amplitud")
     plt.show()
 
-# Configuración de la Interfaz
-top = tk.Tk()
-top.title("HMI para Procesamiento de Señales")
-top.geometry("500x400")
+def main():
+    global filter_var, cutoff_slider, high_cutoff_slider, order_slider
+    # Configuración de la Interfaz
+    top = tk.Tk()
+    top.title("HMI para Procesamiento de Señales")
+    top.geometry("500x400")
+
+    tk.Button(top, text="Cargar Archivo", command=load_audio).pack()
+    tk.Button(top, text="Reproducir Original", command=lambda: play_audio(True)).pack()
+    tk.Button(top, text="Reproducir Procesado", command=lambda: play_audio(False)).pack()
+    tk.Button(top, text="Detener", command=stop_audio).pack()
+
+    tk.Label(top, text="Filtro:").pack()
+    filter_var = tk.StringVar(value="Pasa-baja")
+    ttkn = ttk.Combobox(top, textvariable=filter_var, values=["Pasa-baja", "Pasa-alta", "Pasa-banda"])
+    ttkn.bind("<<ComboboxSelected>>", update_playback)
+    ttkn.pack()
 
-tk.Button(top, text="Cargar Archivo", command=load_audio).pack()
-tk.Button(top, text="Reproducir Original", command=lambda: play_audio(True)).pack()
-tk.Button(top, text="Reproducir Procesado", command=lambda: play_audio(False)).pack()
+    tk.Label(top, text="Frecuencia de Corte (Hz):").pack()
+    cutoff_slider = tk.Scale(top, from_=100, to=10000, orient="horizontal", command=update_playback)
+    cutoff_slider.pack()
 
-tk.Label(top, text="Filtro:").pack()
-filter_var = tk.StringVar(value="Pasa-baja")
-ttkn = ttk.Combobox(top, textvariable=filter_var, values=["Pasa-baja", "Pasa-alta", "Pasa-banda"])
-ttkn.pack()
+    tk.Label(top, text="Frecuencia Alta (Hz) para Pasa-banda:").pack()
+    high_cutoff_slider = tk.Scale(top, from_=500, to=15000, orient="horizontal", command=update_playback)
+    high_cutoff_slider.pack()
 
-tk.Label(top, text="Frecuencia de Corte (Hz):").pack()
-cutoff_slider = tk.Scale(top, from_=100, to=10000, orient="horizontal")
-cutoff_slider.pack()
+    tk.Label(top, text="Orden del Filtro:").pack()
+    order_slider = tk.Scale(top, from_=1, to=10, orient="horizontal", command=update_playback)
+    order_slider.pack()
 
-tk.Label(top, text="Frecuencia Alta (Hz) para Pasa-banda:").pack()
-high_cutoff_slider = tk.Scale(top, from_=500, to=15000, orient="horizontal")
-high_cutoff_slider.pack()
+    tk.Button(top, text="Aplicar Filtro", command=apply_filter).pack()
+    tk.Button(top, text="Aplicar Transformada", command=apply_fft).pack()
+    tk.Button(top, text="Guardar Resultado", command=save_audio).pack()
 
-tk.Label(top, text="Orden del Filtro:").pack()
-order_slider = tk.Scale(top, from_=1, to=10, orient="horizontal")
-order_slider.pack()
+    threading.Thread(target=preload_heavy_modules, daemon=True).start()
+    top.mainloop()
+    stop_audio()
 
-tk.Button(top, text="Aplicar Filtro", command=apply_filter).pack()
-tk.Button(top, text="Aplicar Transformada", command=apply_fft).pack()
-tk.Button(top, text="Guardar Resultado", command=save_audio).pack()
 
-top.mainloop()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# Pruebas de rendimiento del núcleo de procesamiento
+# Daniel Nava Mondragón A0166161649
+#
+# Uso:
+#   python rendimiento.py                         casos de hasta 60 s
+#   python rendimiento.py --max-duracion 3600     incluye la hora completa
+#   python rendimiento.py -o base.json            guarda los resultados
+#   python rendimiento.py --comparar base.json    marca las regresiones
+#   python rendimiento.py --arranque              comprueba el arranque de la HMI
+#
+# Con señales sintéticas de varias duraciones, frecuencias de muestreo y
+# números de canales se mide el tiempo de los filtros, la FFT, la lectura y
+# escritura de WAV y la preparación de las gráficas. Cada resultado incluye
+# el rendimiento en muestras por segundo y la memoria pico (tracemalloc).
+# Al comparar con una corrida anterior, una operación es una regresión si
+# pierde más de la tolerancia en rendimiento o la gana en memoria.
+#
+# --arranque abre version_tres en un proceso nuevo y mide cuánto tarda la
+# ventana en pintarse por primera vez. Falla si supera STARTUP_TARGET o si
+# para entonces ya se importaron scipy, matplotlib o QtMultimedia.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+from dsp import bandpass_filter, compute_fft, highpass_filter, load_wav, lowpass_filter, save_wav
+from dsp.envolvente import MinMaxPyramid
+
+# (segundos, frecuencia de muestreo, canales)
+CASES = [
+    (1, 44100, 1),
+    (1, 48000, 8),
+    (10, 44100, 2),
+    (60, 48000, 2),
+    (600, 48000, 1),
+    (3600, 44100, 1),
+]
+
+# Duración máxima por defecto: los casos largos tardan minutos
+DEFAULT_MAX_DURATION = 60
+
+# Pérdida relativa tolerada antes de marcar una regresión
+DEFAULT_TOLERANCE = 0.2
+
+# Ancho en píxeles de una gráfica típica para la envolvente
+PLOT_WIDTH = 1500
+
+# Tiempo máximo (s) desde que arranca Python hasta que se pinta la ventana
+STARTUP_TARGET = 1.0
+
+# Módulos que no deben cargarse antes de mostrar la ventana
+STARTUP_DEFERRED = ('scipy', 'matplotlib', 'PyQt5.QtMultimedia')
+
+# Se ejecuta en un proceso aparte para partir de un intérprete limpio
+_STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+import version_tres
+
+result = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and 'ventana' not in result:
+            result['ventana'] = time.perf_counter() - start
+            result['cargados'] = [m for m in %r if m in sys.modules]
+        return False
+
+app = QApplication(sys.argv)
+window = version_tres.SignalProcessor()
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+
+def check():
+    if 'ventana' in result and window.canvas is not None:
+        result['graficas'] = time.perf_counter() - start
+        app.quit()
+    else:
+        QTimer.singleShot(10, check)
+
+QTimer.singleShot(0, check)
+QTimer.singleShot(30000, app.quit)
+app.exec_()
+print(json.dumps(result))
+''' % (STARTUP_DEFERRED,)
+
+
+def synthetic_signal(seconds, sample_rate, channels, seed=0):
+    """
+    Señal PCM de 16 bits (muestras, canales): un barrido de 20 Hz a la
+    mitad de Nyquist más ruido, distinta en cada canal.
+    """
+    frames = int(seconds * sample_rate)
+    t = np.arange(frames) / sample_rate
+    sweep = np.sin(2 * np.pi * 20 * t + np.pi * (sample_rate / 4 - 20) * t ** 2 / max(seconds, 1))
+    rng = np.random.default_rng(seed)
+    data = np.empty((frames, channels), dtype=np.int16)
+    for ch in range(channels):
+        noise = rng.standard_normal(frames)
+        data[:, ch] = np.clip((0.6 * sweep + 0.1 * noise) * 32767, -32768, 32767)
+    return data
+
+
+def _plot_prep(data):
+    pyramid = MinMaxPyramid(data)
+    pyramid.envelope(0, pyramid.frames, PLOT_WIDTH)
+
+
+def operations(data, sample_rate, directory):
+    """
+    Operaciones medidas: nombre -> función sin argumentos.
+    """
+    path = os.path.join(directory, 'senal.wav')
+    save_wav(path, sample_rate, data)
+    return {
+        'pasa_baja': lambda: lowpass_filter(data, sample_rate, 1000),
+        'pasa_alta': lambda: highpass_filter(data, sample_rate, 10000),
+        'pasa_banda': lambda: bandpass_filter(data, sample_rate, 1000, 10000),
+        'pasa_baja_fir': lambda: lowpass_filter(data, sample_rate, 1000, engine='fir'),
+        'fft': lambda: compute_fft(data, sample_rate),
+        'guardar_wav': lambda: save_wav(os.path.join(directory, 'salida.wav'), sample_rate, data),
+        'cargar_wav': lambda: np.asarray(load_wav(path)[0]).sum(),
+        'preparar_grafica': lambda: _plot_prep(data),
+    }
+
+
+def measure(func, repeat):
+    """
+    Mejor tiempo de repeat ejecuciones y memoria pico de una ejecución
+    aparte (tracemalloc hace más lenta la medición de tiempo).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(max_duration=DEFAULT_MAX_DURATION, repeat=3, only=None, log=print):
+    """
+    Ejecuta los casos de hasta max_duration segundos y devuelve el reporte.
+    only limita las operaciones a los nombres indicados.
+    """
+    results = []
+    for seconds, sample_rate, channels in CASES:
+        if seconds > max_duration:
+            continue
+        data = synthetic_signal(seconds, sample_rate, channels)
+        samples = data.size
+        # Los casos largos se miden una sola vez
+        case_repeat = repeat if seconds <= 60 else 1
+        with tempfile.TemporaryDirectory() as directory:
+            for name, func in operations(data, sample_rate, directory).items():
+                if only and name not in only:
+                    continue
+                elapsed, peak = measure(func, case_repeat)
+                result = {
+                    'operacion': name, 'duracion': seconds, 'frecuencia': sample_rate,
+                    'canales': channels, 'segundos': elapsed,
+                    'muestras_por_segundo': samples / elapsed if elapsed else float('inf'),
+                    'memoria_pico': peak,
+                }
+                results.append(result)
+                log(f"{_case_key(result):<38} {elapsed * 1000:10.1f} ms "
+                    f"{result['muestras_por_segundo'] / 1e6:9.1f} M/s "
+                    f"{peak / 2 ** 20:9.1f} MiB")
+    return {
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sistema': {
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'maquina': platform.machine(),
+            'procesador': platform.processor(), 'nucleos': os.cpu_count(),
+        },
+        'resultados': results,
+    }
+
+
+def _case_key(result):
+    return (f"{result['operacion']} {result['duracion']}s "
+            f"{result['frecuencia']}Hz {result['canales']}ch")
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compara con un reporte anterior. Devuelve la lista de regresiones como
+    (caso, medida, valor anterior, valor actual).
+    """
+    previous = {_case_key(r): r for r in baseline['resultados']}
+    regressions = []
+    for result in report['resultados']:
+        key = _case_key(result)
+        before = previous.get(key)
+        if before is None:
+            continue
+        if result['muestras_por_segundo'] < before['muestras_por_segundo'] * (1 - tolerance):
+            regressions.append((key, 'muestras_por_segundo', before['muestras_por_segundo'],
+                                result['muestras_por_segundo']))
+        if result['memoria_pico'] > before['memoria_pico'] * (1 + tolerance):
+            regressions.append((key, 'memoria_pico', before['memoria_pico'],
+                                result['memoria_pico']))
+    return regressions
+
+
+def startup_check(target=STARTUP_TARGET, repeat=3):
+    """
+    Mide el arranque de version_tres (mejor de repeat procesos nuevos).
+    Devuelve (resultado, lista de problemas).
+    """
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result.get('ventana', float('inf')) < best.get('ventana', float('inf')):
+            best = result
+    problems = []
+    if 'ventana' not in best:
+        problems.append("la ventana no llegó a pintarse")
+    elif best['ventana'] > target:
+        problems.append(f"la ventana tardó {best['ventana']:.2f} s (objetivo {target:.2f} s)")
+    if best.get('cargados'):
+        problems.append("cargados antes de mostrar la ventana: " + ", ".join(best['cargados']))
+    return best, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mide el rendimiento de filtros, FFT, E/S de WAV y gráficas.")
+    parser.add_argument("-o", "--salida", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="reporte JSON anterior con el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=DEFAULT_TOLERANCE,
+                        help="pérdida relativa tolerada (por defecto 0.2 = 20 %%)")
+    parser.add_argument("--max-duracion", type=float, default=DEFAULT_MAX_DURATION,
+                        help="duración máxima de los casos en segundos (hasta 3600)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="ejecuciones por medición; se toma la más rápida")
+    parser.add_argument("--solo", nargs='+', help="medir solo estas operaciones")
+    parser.add_argument("--arranque", action="store_true",
+                        help="solo comprobar el tiempo de arranque de version_tres")
+    parser.add_argument("--objetivo", type=float, default=STARTUP_TARGET,
+                        help="tiempo máximo de arranque en segundos")
+    args = parser.parse_args(argv)
+
+    if args.arranque:
+        result, problems = startup_check(args.objetivo)
+        print(f"Ventana visible en {result.get('ventana', float('nan')):.3f} s, "
+              f"gráficas listas en {result.get('graficas', float('nan')):.3f} s")
+        for problem in problems:
+            print("FALLA: " + problem)
+        return 1 if problems else 0
+
+    report = run(args.max_duracion, args.repeticiones, args.solo)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerancia)
+        for key, metric, before, after in regressions:
+            print(f"REGRESIÓN {key}: {metric} {before:.4g} -> {after:.4g}")
+        if regressions:
+            return 1
+        print("Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,41 +4,19 @@
 
 
 import sys
-import numpy as np
 import matplotlib.pyplot as plt
-from scipy import signal
-import wave
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QLabel, QVBoxLayout, QWidget,
     QPushButton, QComboBox, QSpinBox, QDoubleSpinBox, QHBoxLayout
 )
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
+from dsp import lowpass_filter, highpass_filter, bandpass_filter, load_wav
+from dsp import compute_fft as apply_fft
+from dsp.envolvente import MinMaxPyramid
+from graficas import WaveformLine, plot_spectrum
 
-def lowpass_filter(signal_data, sample_rate, cutoff_freq, order):
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='low', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def highpass_filter(signal_data, sample_rate, cutoff_freq, order):
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='high', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def bandpass_filter(signal_data, sample_rate, low_cutoff, high_cutoff, order):
-    nyquist = 0.5 * sample_rate
-    low = low_cutoff / nyquist
-    high = high_cutoff / nyquist
-    b, a = signal.butter(order, [low, high], btype='band', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def apply_fft(signal_data, sample_rate):
-    n = len(signal_data)
-    freq = np.fft.fftfreq(n, d=1/sample_rate)
-    fft_signal = np.fft.fft(signal_data)
-    return freq[:n//2], np.abs(fft_signal)[:n//2]
 
 class SignalProcessor(QMainWindow):
     def __init__(self):
@@ -48,6 +26,7 @@ class SignalProcessor(QMainWindow):
 
         self.audio_data = None
         self.sample_rate = None
+        self.audio_pyramid = None  # Envolventes de la señal original, una vez por archivo
 
         self.init_ui()
 
@@ -90,6 +69,7 @@ class SignalProcessor(QMainWindow):
 
         self.figure, self.ax = plt.subplots(2, 1, figsize=(8, 6))
         self.canvas = FigureCanvas(self.figure)
+        layout.addWidget(NavigationToolbar(self.canvas, self))
         layout.addWidget(self.canvas)
 
         container = QWidget()
@@ -99,11 +79,9 @@ class SignalProcessor(QMainWindow):
     def load_audio(self):
         path, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo de audio", "", "WAV Files (*.wav)")
         if path:
-            with wave.open(path, 'rb') as wav_file:
-                self.sample_rate = wav_file.getframerate()
-                frames = wav_file.readframes(-1)
-                self.audio_data = np.frombuffer(frames, dtype=np.int16)
-            self.plot_signal(self.audio_data, title="Señal Original")
+            self.audio_data, self.sample_rate = load_wav(path)
+            self.audio_pyramid = MinMaxPyramid(self.audio_data)
+            self.plot_signal(self.audio_pyramid, title="Señal Original")
 
     def process_signal(self):
         if self.audio_data is None:
@@ -129,11 +107,13 @@ class SignalProcessor(QMainWindow):
         self.plot_signal(processed, title="Señal Procesada")
 
     def plot_signal(self, data, title=""):
-        time = np.linspace(0, len(data) / self.sample_rate, num=len(data))
         self.ax[0].cla()
         self.ax[1].cla()
-        self.ax[0].plot(time, self.audio_data, label="Original", alpha=0.6)
-        self.ax[1].plot(time, data, label=title, color='orange')
+        # Solo se dibujan tantos puntos como píxeles (envolvente mín/máx)
+        self.lines = [
+            WaveformLine(self.ax[0], self.audio_pyramid, self.sample_rate, label="Original", alpha=0.6),
+            WaveformLine(self.ax[1], data, self.sample_rate, label=title, color='orange'),
+        ]
         self.ax[0].set_title("Señal Original")
         self.ax[1].set_title(title)
         self.figure.tight_layout()
@@ -142,9 +122,11 @@ class SignalProcessor(QMainWindow):
     def plot_fft(self, freq, fft_data):
         self.ax[0].cla()
         self.ax[1].cla()
-        self.ax[0].plot(self.audio_data[:len(freq)], label="Original")
+        self.lines = [
+            WaveformLine(self.ax[0], self.audio_pyramid, self.sample_rate, label="Original"),
+            plot_spectrum(self.ax[1], freq, fft_data, color='purple'),
+        ]
         self.ax[0].set_title("Señal Original (dominio del tiempo)")
-        self.ax[1].plot(freq, fft_data, color='purple')
         self.ax[1].set_title("Transformada de Fourier (FFT)")
         self.figure.tight_layout()
         self.canvas.draw()
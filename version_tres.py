@@ -1,46 +1,158 @@
 # VERSION 4 - Solo WAV
 # Daniel Nava Mondragón A0166161649
 
+# Para que la ventana aparezca cuanto antes, al arrancar solo se importan
+# Qt y numpy. matplotlib se carga justo después de mostrar la ventana,
+# scipy (filtros, FFT, cadenas) en un hilo en segundo plano y QtMultimedia
+# y PyAudio al reproducir por primera vez.
+
+import importlib
 import sys
-import numpy as np
-import matplotlib.pyplot as plt
 import os
-import wave
-from scipy import signal
+import threading
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QLabel, QVBoxLayout, QWidget,
-    QPushButton, QComboBox, QSpinBox, QDoubleSpinBox, QHBoxLayout
+    QPushButton, QComboBox, QSpinBox, QDoubleSpinBox, QHBoxLayout, QProgressBar,
+    QCheckBox
 )
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from scipy.io.wavfile import write as write_wav
-
-def lowpass_filter(signal_data, sample_rate, cutoff_freq, order):
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='low', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def highpass_filter(signal_data, sample_rate, cutoff_freq, order):
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff_freq / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='high', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def bandpass_filter(signal_data, sample_rate, low_cutoff, high_cutoff, order):
-    nyquist = 0.5 * sample_rate
-    low = low_cutoff / nyquist
-    high = high_cutoff / nyquist
-    b, a = signal.butter(order, [low, high], btype='band', analog=False)
-    return signal.filtfilt(b, a, signal_data)
-
-def compute_fft(signal_data, sample_rate):
-    n = len(signal_data)
-    freq = np.fft.fftfreq(n, d=1/sample_rate)
-    fft_signal = np.fft.fft(signal_data)
-    return freq[:n//2], np.abs(fft_signal)[:n//2]
+from PyQt5.QtCore import QTimer, QUrl, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from dsp import perfil
+from dsp.cache import ResultCache
+from dsp.envolvente import MinMaxPyramid
+from dsp.wav import WavFile, WavWriter, load_wav, float_to_pcm
+from graficas import LiveSpectrogram, WaveformLine, plot_spectrum
+
+# Módulos que dependen de scipy; se precargan en segundo plano
+HEAVY_MODULES = ('dsp.filtros', 'dsp.espectro', 'dsp.bloques', 'dsp.cadena', 'dsp.reproduccion')
+
+
+def preload_heavy_modules():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+# Tipo de filtro de scipy para cada opción del menú
+FILTER_TYPES = {"Pasa baja": 'low', "Pasa alta": 'high', "Pasa banda": 'band'}
+
+# La vista previa filtra como máximo estos segundos de la zona visible
+PREVIEW_SECONDS = 20
+
+# Precisión del filtrado: float32 usa la mitad de memoria que float64 y
+# basta para audio que se guarda en PCM de 16 bits
+PROCESS_DTYPE = np.float32
+
+# Tipos de trabajo que cada tipo nuevo puede sustituir: una carga en curso
+# solo la sustituye otra carga, para no filtrar el archivo anterior
+SUPERSEDES = {
+    "load": ("load", "process", "preview"),
+    "process": ("process", "preview"),
+    "preview": ("preview",),
+}
+
+# Cuadros por segundo del espectrograma en vivo; cada cuadro recolorea
+# toda la imagen, así que el costo de CPU es proporcional
+LIVE_FPS = 20
+
+
+class Cancelled(Exception):
+    """
+    El trabajo se canceló o fue sustituido por uno más reciente.
+    """
+
+
+class JobSignals(QObject):
+    progress = pyqtSignal(int, int)     # id del trabajo, porcentaje
+    finished = pyqtSignal(int, object)  # id del trabajo, resultado
+    failed = pyqtSignal(int, str)
+
+
+class Job(QRunnable):
+    """
+    Ejecuta task(report) en un hilo del QThreadPool. task llama a
+    report(fracción) para publicar su avance; si el trabajo se canceló,
+    report lanza Cancelled y el resultado nunca llega a la interfaz.
+    """
+
+    def __init__(self, job_id, task):
+        super().__init__()
+        self.job_id = job_id
+        self.task = task
+        self.signals = JobSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, fraction):
+        if self._cancelled.is_set():
+            raise Cancelled()
+        self.signals.progress.emit(self.job_id, int(100 * fraction))
+
+    def run(self):
+        try:
+            result = self.task(self.report)
+        except Cancelled:
+            return
+        except Exception as exc:
+            self.signals.failed.emit(self.job_id, str(exc))
+            return
+        if not self._cancelled.is_set():
+            self.signals.finished.emit(self.job_id, result)
+
+
+class LiveSpectrogramWindow(QWidget):
+    """
+    Ventana con el espectrograma deslizante de una fuente en vivo
+    (RealtimeSource o CaptureSource). En cada cuadro se leen las muestras
+    disponibles, se calculan solo los segmentos nuevos y la imagen se
+    redibuja por blit.
+    """
+
+    def __init__(self, source, title):
+        super().__init__()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from dsp.espectro import SlidingSpectrogram
+
+        self.setWindowTitle(title)
+        self.resize(900, 450)
+        self.source = source
+        self.spectrogram = SlidingSpectrogram(source.sample_rate)
+        figure = Figure(figsize=(9, 4))
+        self.canvas = FigureCanvas(figure)
+        ax = figure.subplots()
+        self.display = LiveSpectrogram(ax, self.spectrogram)
+        figure.colorbar(self.display.mappable, ax=ax, label="dB")
+        figure.tight_layout()
+        self.status_label = QLabel("")
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.canvas, 1)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_frame)
+        self.source.start()
+        self.timer.start(1000 // LIVE_FPS)
+
+    def update_frame(self):
+        block = self.source.read_available()
+        if len(block) and self.spectrogram.push(block):
+            self.display.update()
+        if self.source.finished:
+            self.timer.stop()
+            self.status_label.setText("Fin de la señal")
+        elif self.source.dropped:
+            self.status_label.setText(
+                f"Muestras descartadas por atraso: {self.source.dropped / self.source.sample_rate:.1f} s")
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.source.stop()
+        super().closeEvent(event)
+
 
 class SignalProcessor(QMainWindow):
     def __init__(self):
@@ -51,12 +163,32 @@ class SignalProcessor(QMainWindow):
         self.audio_data = None
         self.sample_rate = None
         self.processed_data = None
+        self.fft_orig = None  # Espectros calculados una vez por señal
+        self.fft_proc = None
+        self.audio_pyramid = None  # Envolventes para graficar
+        self.processed_pyramid = None
         self.audio_path = None
         self.processed_path = None
-        self.process_count = 0  # Contador para nombres únicos
-
-        self.player = QMediaPlayer()
-
+        # Los WAV procesados se guardan en la caché por contenido y
+        # parámetros, en lugar de un processed_N.wav nuevo por cada clic
+        self.result_cache = ResultCache()
+
+        self.player = None  # QMediaPlayer, se crea al reproducir
+        self.live_player = None  # Reproducción filtrada en vivo: (motor, salida)
+        self.live_window = None  # Espectrograma en vivo
+
+        # Carga y filtrado se ejecutan fuera del hilo de la interfaz; solo
+        # hay un trabajo vigente y uno nuevo sustituye al anterior si su
+        # tipo lo permite (SUPERSEDES).
+        self.pool = QThreadPool.globalInstance()
+        self.job = None
+        self.job_kind = None
+        self.job_done = None
+        self.job_count = 0
+        self.deferred = None  # Acción pendiente hasta que termine la carga
+
+        self.figure = None  # La figura se crea al mostrar la ventana
+        self.canvas = None
         self.init_ui()
 
 
@@ -97,6 +229,35 @@ class SignalProcessor(QMainWindow):
         self.process_button.clicked.connect(self.process_signal)
         layout.addWidget(self.process_button)
 
+        self.save_chain_button = QPushButton("Guardar cadena (para procesar por lotes)")
+        self.save_chain_button.clicked.connect(self.save_chain)
+        layout.addWidget(self.save_chain_button)
+
+        self.preview_check = QCheckBox("Vista previa en vivo (zona visible)")
+        layout.addWidget(self.preview_check)
+
+        self.profile_check = QCheckBox("Medir tiempos por etapa")
+        self.profile_check.toggled.connect(self.toggle_profiling)
+        layout.addWidget(self.profile_check)
+
+        # Un cambio de parámetros mientras se filtra reinicia el trabajo
+        self.filter_box.currentIndexChanged.connect(self.on_params_changed)
+        self.freq_spin.valueChanged.connect(self.on_params_changed)
+        self.freq_spin2.valueChanged.connect(self.on_params_changed)
+        self.order_spin.valueChanged.connect(self.on_params_changed)
+
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        progress_layout.addWidget(self.progress_bar)
+        self.cancel_button = QPushButton("Cancelar")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_job)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addLayout(progress_layout)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
         btn_layout = QHBoxLayout()
         self.play_original_btn = QPushButton("Reproducir Original")
         self.play_original_btn.clicked.connect(self.play_original_audio)
@@ -106,95 +267,367 @@ class SignalProcessor(QMainWindow):
         self.play_processed_btn.clicked.connect(self.play_processed_audio)
         btn_layout.addWidget(self.play_processed_btn)
 
+        self.live_button = QPushButton("Espectrograma en vivo")
+        self.live_button.clicked.connect(self.show_live_spectrogram)
+        btn_layout.addWidget(self.live_button)
+
         layout.addLayout(btn_layout)
 
-        self.figure, self.ax = plt.subplots(2, 2, figsize=(10, 8))
-        self.canvas = FigureCanvas(self.figure)
-        layout.addWidget(self.canvas)
+        self.plot_placeholder = QLabel("Cargando gráficas...")
+        layout.addWidget(self.plot_placeholder, 1)
+        self.main_layout = layout
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-    def load_audio(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo WAV", "", "WAV Files (*.wav)")
-        if path:
-            self.audio_path = path
-            with wave.open(path, 'rb') as wav_file:
-                self.sample_rate = wav_file.getframerate()
-                frames = wav_file.readframes(-1)
-                self.audio_data = np.frombuffer(frames, dtype=np.int16)
-            self.processed_data = None
-            self.plot_all()
-
-    def process_signal(self):
-        if self.audio_data is None:
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        # matplotlib se carga después de que la ventana se pinta por primera vez
+        if self.canvas is None:
+            QTimer.singleShot(0, self.init_plots)
+
+    def init_plots(self):
+        """
+        Crea la figura de matplotlib en lugar del aviso "Cargando gráficas".
+        Se llama en cuanto la ventana está visible; scipy se importa mientras
+        tanto en otro hilo.
+        """
+        if self.canvas is not None:
             return
+        threading.Thread(target=preload_heavy_modules, daemon=True).start()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
-        signal_data = self.audio_data
-        filter_type = self.filter_box.currentText()
+        self.figure = Figure(figsize=(10, 8))
+        self.ax = self.figure.subplots(2, 2)
+        self.canvas = FigureCanvas(self.figure)
+        index = self.main_layout.indexOf(self.plot_placeholder)
+        self.main_layout.insertWidget(index, NavigationToolbar(self.canvas, self))
+        self.main_layout.insertWidget(index + 1, self.canvas, 1)
+        self.main_layout.removeWidget(self.plot_placeholder)
+        self.plot_placeholder.deleteLater()
+
+    def start_job(self, kind, task, on_done):
+        """
+        Lanza task en segundo plano y llama a on_done(resultado) en el hilo
+        de la interfaz al terminar. Cancela el trabajo anterior, si lo hay y
+        kind puede sustituirlo; si no, no lanza nada y devuelve False.
+        """
+        if self.job is not None:
+            if self.job_kind not in SUPERSEDES[kind]:
+                return False
+            self.job.cancel()
+        self.job_count += 1
+        self.job = Job(self.job_count, task)
+        self.job_kind = kind
+        self.job_done = on_done
+        self.job.signals.progress.connect(self.on_job_progress)
+        self.job.signals.finished.connect(self.on_job_finished)
+        self.job.signals.failed.connect(self.on_job_failed)
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.status_label.setText("Procesando...")
+        self.pool.start(self.job)
+        return True
+
+    def is_current_job(self, job_id):
+        return self.job is not None and self.job.job_id == job_id
+
+    def finish_job(self, message):
+        self.job = None
+        self.job_kind = None
+        self.job_done = None
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(message)
+
+    def on_job_progress(self, job_id, percent):
+        if self.is_current_job(job_id):
+            self.progress_bar.setValue(percent)
+
+    def on_job_finished(self, job_id, result):
+        if not self.is_current_job(job_id):
+            return  # Resultado de un trabajo ya sustituido
+        on_done = self.job_done
+        deferred, self.deferred = self.deferred, None
+        self.finish_job("Listo")
+        self.progress_bar.setValue(100)
+        on_done(result)
+        self.show_profile()
+        if deferred is not None:
+            deferred()
+
+    def toggle_profiling(self, checked):
+        if checked:
+            perfil.enable(memory=True)
+            self.status_label.setText("Midiendo tiempos por etapa")
+        else:
+            perfil.disable()
+            self.status_label.setText("")
+
+    def show_profile(self):
+        # Las mediciones se acumulan desde que se activó la casilla
+        profiler = perfil.current()
+        if profiler is not None:
+            self.status_label.setText("Listo — " + profiler.summary())
+
+    def on_job_failed(self, job_id, message):
+        if self.is_current_job(job_id):
+            self.deferred = None
+            self.finish_job(f"Error: {message}")
+
+    def cancel_job(self):
+        self.deferred = None
+        if self.job is not None:
+            self.job.cancel()
+            self.finish_job("Cancelado")
+            self.progress_bar.setValue(0)
+
+    def on_params_changed(self, *_):
+        if self.live_player is not None:
+            self.live_player[0].set_filter(*self.filter_params())
+        if self.job_kind == "process":
+            self.process_signal()
+        elif self.preview_check.isChecked() and self.job_kind != "load":
+            # Durante una carga no hay vista previa: la señal en pantalla
+            # está por ser sustituida
+            self.preview_signal()
+
+    def filter_params(self):
+        btype = FILTER_TYPES[self.filter_box.currentText()]
         order = self.order_spin.value()
         cutoff1 = self.freq_spin.value()
         cutoff2 = self.freq_spin2.value()
+        cutoff = (cutoff1, cutoff2) if btype == 'band' else cutoff1
+        return btype, cutoff, order
+
+    def save_chain(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Guardar cadena", "", "Cadenas (*.json)")
+        if path:
+            from dsp import Pipeline
+            btype, cutoff, order = self.filter_params()
+            Pipeline([{"tipo": btype, "corte": cutoff, "orden": order}]).save(path)
+
+    def preview_signal(self):
+        """
+        Filtra solo la zona visible de la señal original (más el relleno
+        necesario para los transitorios) y la muestra sin escribir ningún
+        archivo. El archivo completo se procesa al pulsar "Aplicar filtro".
+        """
+        if self.audio_data is None or self.job_kind == "load":
+            return
+
+        signal_data = self.audio_data
+        sample_rate = self.sample_rate
+        btype, cutoff, order = self.filter_params()
+        x_min, x_max = self.ax[0][0].get_xlim()
+        first = max(0, int(x_min * sample_rate))
+        last = min(len(signal_data), int(x_max * sample_rate) + 1)
+        last = min(last, first + PREVIEW_SECONDS * sample_rate)
+
+        def task(report):
+            from dsp import compute_fft, design_filter, filter_range
+            sos = design_filter(btype, sample_rate, cutoff, order)
+            preview = filter_range(signal_data, sos, first, last, dtype=PROCESS_DTYPE)
+            report(0.8)
+            fft = compute_fft(preview, sample_rate)
+            report(1.0)
+            return first, preview, fft
+
+        self.start_job("preview", task, self.on_preview_ready)
+
+    def on_preview_ready(self, result):
+        first, preview, (freq, fft_data) = result
+        ax_time, ax_fft = self.ax[1]
+        ax_time.clear()
+        ax_fft.clear()
+        self.preview_lines = [
+            WaveformLine(ax_time, preview, self.sample_rate, x0=first / self.sample_rate,
+                         color='orange', alpha=0.8),
+            plot_spectrum(ax_fft, freq, fft_data, color='red', alpha=0.8),
+        ]
+        ax_time.set_title("Vista previa (sin aplicar)")
+        ax_time.set_xlabel("Tiempo [s]")
+        ax_fft.set_title("FFT de la vista previa")
+        ax_fft.set_xlabel("Frecuencia [Hz]")
+        self.canvas.draw_idle()
+
+    def load_audio(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Seleccionar archivo WAV", "", "WAV Files (*.wav)")
+        if not path:
+            return
 
-        if filter_type == "Pasa baja":
-            self.processed_data = lowpass_filter(signal_data, self.sample_rate, cutoff1, order)
-        elif filter_type == "Pasa alta":
-            self.processed_data = highpass_filter(signal_data, self.sample_rate, cutoff1, order)
-        elif filter_type == "Pasa banda":
-            self.processed_data = bandpass_filter(signal_data, self.sample_rate, cutoff1, cutoff2, order)
+        def task(report):
+            from dsp import compute_fft
+            data, sample_rate = load_wav(path)
+            report(0.2)
+            fft = compute_fft(data, sample_rate)
+            report(0.6)
+            pyramid = MinMaxPyramid(data)
+            report(1.0)
+            return path, data, sample_rate, fft, pyramid
 
-        # Incrementar el contador y generar un nuevo nombre
-        self.process_count += 1
-        self.processed_path = f"processed_{self.process_count}.wav"
+        self.start_job("load", task, self.on_audio_loaded)
 
-        write_wav(self.processed_path, self.sample_rate, self.processed_data.astype(np.int16))
+    def on_audio_loaded(self, result):
+        self.audio_path, self.audio_data, self.sample_rate, self.fft_orig, self.audio_pyramid = result
+        self.processed_data = None
+        self.fft_proc = None
+        self.processed_pyramid = None
+        self.plot_all()
+
+    def process_signal(self):
+        if self.job_kind == "load":
+            # Se filtra el archivo nuevo en cuanto termine de cargarse
+            self.deferred = self.process_signal
+            self.status_label.setText("Cargando; se filtrará al terminar")
+            return
+        if self.audio_data is None:
+            return
+
+        signal_data = self.audio_data
+        sample_rate = self.sample_rate
+        audio_path = self.audio_path
+        cache = self.result_cache
+        btype, cutoff, order = self.filter_params()
+        params = {"filtro": btype, "corte": cutoff, "orden": order,
+                  "precision": np.dtype(PROCESS_DTYPE).name}
+
+        def task(report):
+            from dsp import compute_fft, design_filter, filter_array
+
+            def render(path):
+                sos = design_filter(btype, sample_rate, cutoff, order)
+                processed = filter_array(signal_data, sos, dtype=PROCESS_DTYPE,
+                                         progress=lambda done, total: report(0.7 * done / total))
+                # filter_array conserva la escala de las muestras originales:
+                # se guarda con el mismo formato que la entrada, como hace
+                # Pipeline.run_file. Redondeo y saturación sobre el mismo
+                # arreglo, sin más copias
+                source = WavFile(audio_path)
+                if source.dtype.kind == 'f':
+                    processed = processed.astype(source.dtype, copy=False)
+                else:
+                    processed = float_to_pcm(processed, source.dtype, overwrite=True)
+                with WavWriter(path, sample_rate, source.channels, source.dtype,
+                               source.sampwidth) as out_file:
+                    out_file.write(processed)
+
+            # Si ya se procesó este audio con los mismos parámetros, el
+            # resultado sale de la caché sin volver a filtrar
+            processed_path = cache.get_or_create(audio_path, params, render)
+            processed, _ = load_wav(processed_path)
+            report(0.8)
+            fft = compute_fft(processed, sample_rate)
+            report(0.9)
+            pyramid = MinMaxPyramid(processed)
+            report(1.0)
+            return processed_path, processed, fft, pyramid
+
+        self.start_job("process", task, self.on_signal_processed)
+
+    def on_signal_processed(self, result):
+        self.processed_path, self.processed_data, self.fft_proc, self.processed_pyramid = result
         self.plot_all()
 
     def plot_all(self):
+        self.init_plots()
         for ax in self.ax.flatten():
             ax.clear()
 
         if self.audio_data is None:
             return
 
-        time = np.linspace(0, len(self.audio_data) / self.sample_rate, num=len(self.audio_data))
-        freq_orig, fft_orig = compute_fft(self.audio_data, self.sample_rate)
+        # Las curvas solo llevan tantos puntos como píxeles y se recalculan
+        # al hacer zoom o desplazarse
+        freq_orig, fft_orig = self.fft_orig
+        self.lines = []
 
-        self.ax[0][0].plot(time, self.audio_data, label="Original")
+        self.lines.append(WaveformLine(self.ax[0][0], self.audio_pyramid, self.sample_rate, label="Original"))
         self.ax[0][0].set_title("Señal Original")
         self.ax[0][0].set_xlabel("Tiempo [s]")
 
-        self.ax[0][1].plot(freq_orig, fft_orig, color='green')
+        self.lines.append(plot_spectrum(self.ax[0][1], freq_orig, fft_orig, color='green'))
         self.ax[0][1].set_title("FFT de Señal Original")
         self.ax[0][1].set_xlabel("Frecuencia [Hz]")
 
         if self.processed_data is not None:
-            time_proc = np.linspace(0, len(self.processed_data) / self.sample_rate, num=len(self.processed_data))
-            freq_proc, fft_proc = compute_fft(self.processed_data, self.sample_rate)
+            freq_proc, fft_proc = self.fft_proc
 
-            self.ax[1][0].plot(time_proc, self.processed_data, color='orange')
+            self.lines.append(WaveformLine(self.ax[1][0], self.processed_pyramid, self.sample_rate, color='orange'))
             self.ax[1][0].set_title("Señal Procesada")
             self.ax[1][0].set_xlabel("Tiempo [s]")
 
-            self.ax[1][1].plot(freq_proc, fft_proc, color='red')
+            self.lines.append(plot_spectrum(self.ax[1][1], freq_proc, fft_proc, color='red'))
             self.ax[1][1].set_title("FFT de Señal Procesada")
             self.ax[1][1].set_xlabel("Frecuencia [Hz]")
 
-        self.figure.tight_layout()
-        self.canvas.draw()
+        with perfil.stage('grafica'):
+            self.figure.tight_layout()
+            self.canvas.draw()
+
+    def play_file(self, path):
+        from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+        if self.player is None:
+            self.player = QMediaPlayer()
+        url = QUrl.fromLocalFile(os.path.abspath(path))
+        self.player.setMedia(QMediaContent(url))
+        self.player.play()
 
     def play_original_audio(self):
+        self.stop_live_audio()
         if self.audio_path:
-            url = QUrl.fromLocalFile(os.path.abspath(self.audio_path))
-            self.player.setMedia(QMediaContent(url))
-            self.player.play()
+            self.play_file(self.audio_path)
 
     def play_processed_audio(self):
-        if os.path.exists(self.processed_path):
-            url = QUrl.fromLocalFile(os.path.abspath(self.processed_path))
-            self.player.setMedia(QMediaContent(url))
-            self.player.play()
+        self.stop_live_audio()
+        if self.processed_path and os.path.exists(self.processed_path):
+            self.play_file(self.processed_path)
+        elif self.audio_data is not None:
+            # Aún no hay archivo procesado: se filtra en vivo mientras suena
+            # y los cambios de parámetros se oyen de inmediato.
+            from dsp.reproduccion import BlockSource, PlaybackEngine, PyAudioSink
+            if self.player is not None:
+                self.player.stop()
+            engine = PlaybackEngine(BlockSource(self.audio_data, self.sample_rate))
+            engine.set_filter(*self.filter_params())
+            sink = PyAudioSink()
+            sink.start(engine)
+            self.live_player = (engine, sink)
+
+    def stop_live_audio(self):
+        if self.live_player is not None:
+            self.live_player[1].stop()
+            self.live_player = None
+
+    def show_live_spectrogram(self):
+        """
+        Abre el espectrograma en vivo: del archivo cargado, repetido al ritmo
+        real, o del micrófono si no hay archivo.
+        """
+        from dsp.reproduccion import BlockSource, CaptureSource, RealtimeSource
+        if self.live_window is not None:
+            self.live_window.close()
+        if self.audio_data is not None:
+            source = RealtimeSource(BlockSource(self.audio_data, self.sample_rate), loop=True)
+            title = f"Espectrograma en vivo — {os.path.basename(self.audio_path)}"
+        else:
+            try:
+                source = CaptureSource()
+            except (ImportError, OSError) as exc:
+                self.status_label.setText(f"No se pudo abrir el micrófono: {exc}")
+                return
+            title = "Espectrograma en vivo — micrófono"
+        self.live_window = LiveSpectrogramWindow(source, title)
+        self.live_window.show()
+
+    def closeEvent(self, event):
+        self.cancel_job()
+        self.stop_live_audio()
+        if self.live_window is not None:
+            self.live_window.close()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)